@@ -4,18 +4,39 @@
 from __future__ import annotations
 
 import argparse
+import array
+import asyncio
+import bisect
+import hashlib
+import heapq
 import json
+import logging
+import math
+import multiprocessing
 import os
 import pathlib
+import posixpath
+import random
 import re
+import secrets
+import select
+import sqlite3
+import struct
+import threading
+import time
+import urllib.parse
 import xml.etree.ElementTree as ET
-from typing import Any
+import zlib
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Iterable, Iterator
 
 from mcp.server.fastmcp import FastMCP
 
 
 ROOT_DEFAULT = "/workspace"
-_RAG_INDEX: dict[str, str] = {}
+CACHE_DIR_DEFAULT = f"{ROOT_DEFAULT}/.mcp-adapter-cache"
 TEXT_EXTENSIONS = {
     ".c",
     ".cc",
@@ -44,6 +65,33 @@ TEXT_EXTENSIONS = {
     ".yaml",
     ".yml",
 }
+IGNORED_DIR_NAMES = {
+    ".cache",
+    ".git",
+    ".gradle",
+    ".hg",
+    ".idea",
+    ".mcp-adapter-cache",
+    ".mypy_cache",
+    ".next",
+    ".nox",
+    ".nuxt",
+    ".pytest_cache",
+    ".ruff_cache",
+    ".svn",
+    ".terraform",
+    ".tox",
+    ".venv",
+    "__pycache__",
+    "bower_components",
+    "build",
+    "coverage",
+    "dist",
+    "node_modules",
+    "target",
+    "venv",
+}
+IGNORE_FILE_NAMES = (".gitignore", ".ignore")
 
 
 def _to_safe_root(path: str) -> pathlib.Path:
@@ -54,17 +102,320 @@ def _to_safe_root(path: str) -> pathlib.Path:
     return workspace
 
 
-def _iter_files(root: pathlib.Path, max_files: int, max_size_bytes: int = 512 * 1024):
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _cache_dir() -> pathlib.Path | None:
+    value = os.getenv("MCP_ADAPTER_CACHE_DIR", "").strip()
+    if value.lower() in {"off", "none", "0"}:
+        return None
+    return pathlib.Path(value or CACHE_DIR_DEFAULT)
+
+
+class _FileIndex:
+    """Workspace listing manifest; a walk only re-lists directories whose mtime changed.
+
+    Only membership is cached: editing a file in place leaves its directory's mtime alone, so file
+    sizes are stat'ed by the callers that filter on them rather than trusted from the manifest.
+    """
+
+    VERSION = 2
+
+    def __init__(self, store_path: pathlib.Path | None) -> None:
+        self._store_path = store_path
+        self._dirs: dict[str, tuple[int, list[str], list[str]]] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._counters = {"walks": 0, "dirs_reused": 0, "dirs_rescanned": 0}
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self._store_path is None or not self._store_path.is_file():
+            return
+        try:
+            data = json.loads(self._store_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return
+        for directory, (mtime_ns, subdirs, files) in data.get("dirs", {}).items():
+            self._dirs[directory] = (mtime_ns, subdirs, list(files))
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty or self._store_path is None:
+                return
+            payload = {"version": self.VERSION, "dirs": self._dirs}
+            self._dirty = False
+        try:
+            self._store_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._store_path.with_name(self._store_path.name + ".tmp")
+            tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self._store_path)
+        except OSError:
+            pass
+
+    def _drop_subtree(self, directory: str) -> None:
+        prefix = directory.rstrip(os.sep) + os.sep
+        for key in [key for key in self._dirs if key == directory or key.startswith(prefix)]:
+            del self._dirs[key]
+
+    def listing(self, directory: str) -> tuple[list[str], list[str]] | None:
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            with self._lock:
+                if directory in self._dirs:
+                    self._drop_subtree(directory)
+                    self._dirty = True
+            return None
+        record = self._dirs.get(directory)
+        if record is not None and record[0] == mtime_ns:
+            self._counters["dirs_reused"] += 1
+            return record[1], record[2]
+        subdirs: list[str] = []
+        files: list[str] = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif entry.is_file():
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        subdirs.sort()
+        files.sort()
+        with self._lock:
+            if record is not None:
+                for name in set(record[1]) - set(subdirs):
+                    self._drop_subtree(os.path.join(directory, name))
+            self._dirs[directory] = (mtime_ns, subdirs, files)
+            self._dirty = True
+        self._counters["dirs_rescanned"] += 1
+        return subdirs, files
+
+    def mtime(self, directory: str) -> int | None:
+        """mtime_ns the cached listing of directory was taken at, if it is cached."""
+        record = self._dirs.get(directory)
+        return record[0] if record is not None else None
+
+    def is_store_dir(self, directory: str) -> bool:
+        return self._store_path is not None and directory == str(self._store_path.parent)
+
+    def load(self) -> None:
+        with self._lock:
+            self._load()
+        self._counters["walks"] += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "directories": len(self._dirs),
+            "files": sum(len(record[2]) for record in list(self._dirs.values())),
+            "store": str(self._store_path) if self._store_path else None,
+            **self._counters,
+        }
+
+
+def _build_file_index() -> _FileIndex:
+    cache_dir = _cache_dir()
+    return _FileIndex(cache_dir / "file-index.json" if cache_dir else None)
+
+
+_FILE_INDEX = _build_file_index()
+
+
+_IgnoreRule = tuple[re.Pattern[str], bool, bool]
+
+
+def _glob_to_regex(pattern: str) -> str:
+    parts: list[str] = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", index + 1)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[index + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                index = end
+        elif char == "\\" and index + 1 < len(pattern):
+            index += 1
+            parts.append(re.escape(pattern[index]))
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return "".join(parts)
+
+
+def _parse_ignore_file(content: str) -> list[_IgnoreRule]:
+    rules: list[_IgnoreRule] = []
+    for raw in content.splitlines():
+        line = raw.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        # A slash anywhere but at the end anchors the pattern to this directory (gitignore(5)).
+        anchored = "/" in line.rstrip("/")
+        line = line.strip("/")
+        if not line:
+            continue
+        prefix = "" if anchored else "(?:.*/)?"
+        try:
+            regex = re.compile(f"^{prefix}{_glob_to_regex(line)}$")
+        except re.error:
+            continue
+        rules.append((regex, negated, dir_only))
+    return rules
+
+
+_IGNORE_RULES: dict[str, tuple[int, int, list[_IgnoreRule]]] = {}
+
+
+def _ignore_rules(directory: str, names: set[str]) -> list[_IgnoreRule]:
+    rules: list[_IgnoreRule] = []
+    for name in IGNORE_FILE_NAMES:
+        if name not in names:
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        cached = _IGNORE_RULES.get(path)
+        if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+            try:
+                with open(path, encoding="utf-8", errors="ignore") as handle:
+                    parsed = _parse_ignore_file(handle.read())
+            except OSError:
+                parsed = []
+            cached = (stat.st_mtime_ns, stat.st_size, parsed)
+            _IGNORE_RULES[path] = cached
+        rules.extend(cached[2])
+    return rules
+
+
+def _is_ignored(
+    rule_sets: list[tuple[str, list[_IgnoreRule]]], path: str, is_dir: bool
+) -> bool:
+    ignored = False
+    for base, rules in rule_sets:
+        rel = path[len(base) + 1 :].replace(os.sep, "/")
+        for regex, negated, dir_only in rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel):
+                ignored = not negated
+    return ignored
+
+
+def _inherited_rules(path: pathlib.Path) -> list[tuple[str, list[_IgnoreRule]]]:
+    """Ignore rules of the workspace directories above path, outermost first."""
+    workspace = pathlib.Path(ROOT_DEFAULT).resolve()
+    inherited: list[tuple[str, list[_IgnoreRule]]] = []
+    ancestors = [parent for parent in path.parents if parent == workspace or workspace in parent.parents]
+    for ancestor in reversed(ancestors):
+        listing = _FILE_INDEX.listing(str(ancestor))
+        if listing is None:
+            continue
+        rules = _ignore_rules(str(ancestor), set(listing[1]))
+        if rules:
+            inherited.append((str(ancestor), rules))
+    return inherited
+
+
+def _walk_files(
+    root: pathlib.Path, stats: dict[str, int] | None = None, directories: list[str] | None = None
+) -> Iterator[pathlib.Path]:
+    """Yield non-ignored files, pruning ignored subtrees before descending."""
+    stats = stats if stats is not None else {}
+    stats.setdefault("pruned_dirs", 0)
+    stats.setdefault("ignored_files", 0)
+    _FILE_INDEX.load()
+    stack: list[tuple[str, list[tuple[str, list[_IgnoreRule]]]]] = [(str(root), _inherited_rules(root))]
+    try:
+        while stack:
+            directory, rule_sets = stack.pop()
+            listing = _FILE_INDEX.listing(directory)
+            if listing is None:
+                continue
+            if directories is not None:
+                directories.append(directory)
+            subdirs, files = listing
+            rules = _ignore_rules(directory, set(files))
+            if rules:
+                rule_sets = [*rule_sets, (directory, rules)]
+            for name in files:
+                path = os.path.join(directory, name)
+                if rule_sets and _is_ignored(rule_sets, path, is_dir=False):
+                    stats["ignored_files"] += 1
+                    continue
+                yield pathlib.Path(path)
+            for name in reversed(subdirs):
+                path = os.path.join(directory, name)
+                if (
+                    name in IGNORED_DIR_NAMES
+                    or _FILE_INDEX.is_store_dir(path)
+                    or (rule_sets and _is_ignored(rule_sets, path, is_dir=True))
+                ):
+                    stats["pruned_dirs"] += 1
+                    continue
+                stack.append((path, rule_sets))
+    finally:
+        _FILE_INDEX.flush()
+
+
+_SCAN_MAX_BYTES = 512 * 1024
+
+
+def _iter_files(
+    root: pathlib.Path,
+    max_files: int,
+    max_size_bytes: int = _SCAN_MAX_BYTES,
+    suffixes: set[str] | None = None,
+    stats: dict[str, int] | None = None,
+    directories: list[str] | None = None,
+) -> Iterator[pathlib.Path]:
+    allowed = suffixes or TEXT_EXTENSIONS
     count = 0
-    for item in root.rglob("*"):
+    for item in _walk_files(root, stats, directories):
         if count >= max_files:
             break
-        if not item.is_file():
-            continue
-        if item.suffix.lower() not in TEXT_EXTENSIONS:
+        if item.suffix.lower() not in allowed:
             continue
         try:
-            if item.stat().st_size > max_size_bytes:
+            if os.stat(item).st_size > max_size_bytes:
                 continue
         except OSError:
             continue
@@ -72,15 +423,881 @@ def _iter_files(root: pathlib.Path, max_files: int, max_size_bytes: int = 512 *
         yield item
 
 
+def _walk_mtimes(directories: list[str]) -> dict[str, int]:
+    """mtime_ns of each walked directory, as listed by the file index, and of the ignore files in it."""
+    mtimes: dict[str, int] = {}
+    for directory in directories:
+        mtime_ns = _FILE_INDEX.mtime(directory)
+        if mtime_ns is None:
+            continue
+        mtimes[directory] = mtime_ns
+        for name in IGNORE_FILE_NAMES:
+            path = os.path.join(directory, name)
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+    return mtimes
+
+
+def _mtimes_unchanged(mtimes: dict[str, int]) -> bool:
+    """Whether a walk would list the same files again: adds, removes and renames all bump a directory mtime."""
+    for path, mtime_ns in mtimes.items():
+        try:
+            if os.stat(path).st_mtime_ns != mtime_ns:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def _stamps_unchanged(root: str, stamps: dict[str, tuple[int, int]]) -> bool:
+    """Whether every root-relative file still has the (mtime_ns, size) it was stamped with."""
+    for rel, stamp in stamps.items():
+        try:
+            stat = os.stat(os.path.join(root, rel))
+        except OSError:
+            return False
+        if (stat.st_mtime_ns, stat.st_size) != stamp:
+            return False
+    return True
+
+
+class _ContentCache:
+    """Process-wide LRU of decoded file text keyed by ``(path, mtime_ns, size)``."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def read(self, path: pathlib.Path) -> str:
+        key = str(path)
+        try:
+            stat = os.stat(key)
+        except OSError:
+            return ""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry[2]
+            self._counters["misses"] += 1
+        try:
+            text = path.read_text(encoding="utf-8", errors="ignore")
+        except OSError:
+            return ""
+        # A single file may take at most a quarter of the budget so one large read cannot flush the cache.
+        if stat.st_size * 4 > self.max_bytes:
+            return text
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (stat.st_mtime_ns, stat.st_size, text)
+            self._bytes += stat.st_size
+            while self._bytes > self.max_bytes and self._entries:
+                _key, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[1]
+                self._counters["evictions"] += 1
+        return text
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                **self._counters,
+            }
+
+
+_CONTENT_CACHE = _ContentCache(_env_int("MCP_ADAPTER_CONTENT_CACHE_MB", 256) * 1024 * 1024)
+
+
 def _read_text(path: pathlib.Path) -> str:
+    return _CONTENT_CACHE.read(path)
+
+
+class _LineIndex:
+    """Lazily built newline offsets for one file; offsets map to (line, column) by bisection."""
+
+    def __init__(self, content: str) -> None:
+        self._content = content
+        self._starts: list[int] | None = None
+
+    def _line_starts(self) -> list[int]:
+        if self._starts is None:
+            starts = [0]
+            starts.extend(match.end() for match in re.finditer("\n", self._content))
+            self._starts = starts
+        return self._starts
+
+    def position(self, offset: int) -> tuple[int, int]:
+        starts = self._line_starts()
+        line = bisect.bisect_right(starts, offset)
+        return line, offset - starts[line - 1] + 1
+
+    def line_count(self) -> int:
+        starts = self._line_starts()
+        return len(starts) - 1 if len(starts) > 1 and starts[-1] == len(self._content) else len(starts)
+
+    def offset(self, line: int) -> int:
+        starts = self._line_starts()
+        return starts[line - 1] if line <= len(starts) else len(self._content)
+
+    def lines(self, first: int, last: int) -> list[str]:
+        starts = self._line_starts()
+        first = max(1, first)
+        last = min(len(starts), last)
+        return [
+            self._content[starts[line - 1] : starts[line] - 1 if line < len(starts) else len(self._content)]
+            for line in range(first, last + 1)
+        ]
+
+
+_FUNCTION_RE = re.compile(r"^\s*(?:def|function|export\s+function)\s+([A-Za-z_][A-Za-z0-9_]*)", re.MULTILINE)
+_CLASS_RE = re.compile(r"^\s*(?:class|export\s+class)\s+([A-Za-z_][A-Za-z0-9_]*)", re.MULTILINE)
+_SYMBOL_RE = re.compile(
+    r"^\s*(?:export\s+)?(?:async\s+)?(?:function|class|const|let|var|interface|type)\s+([A-Za-z_][A-Za-z0-9_]*)",
+    re.MULTILINE,
+)
+_IMPORT_RE = re.compile(r"^\s*(?:from\s+([A-Za-z0-9_./-]+)\s+import|import\s+([A-Za-z0-9_.,\s/-]+))", re.MULTILINE)
+
+
+_PY_FROM_RE = re.compile(r"^[ \t]*from[ \t]+(\.*[A-Za-z0-9_.]*)[ \t]+import[ \t]+(\([^)]*\)|[^\n#;]*)", re.MULTILINE)
+_PY_IMPORT_RE = re.compile(r"^[ \t]*import[ \t]+([A-Za-z0-9_., \t]+)", re.MULTILINE)
+_PY_NAME_RE = re.compile(r"([A-Za-z_][A-Za-z0-9_]*)(?:\s+as\s+[A-Za-z_][A-Za-z0-9_]*)?")
+_JS_IMPORT_RE = re.compile(
+    r"""(?:\bimport|\bexport)\s[^'";]*?\bfrom\s*['"]([^'"\n]+)['"]"""
+    r"""|\bimport\s*\(?\s*['"]([^'"\n]+)['"]"""
+    r"""|\brequire\s*\(\s*['"]([^'"\n]+)['"]\s*\)"""
+)
+_JS_SUFFIXES = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs", ".vue")
+
+
+def _import_specifiers(content: str, suffix: str) -> list[list[Any]]:
+    """[module, [imported names]] per import statement; names are only tracked for Python from-imports."""
+    specifiers: list[list[Any]] = []
+    if suffix == ".py":
+        for match in _PY_FROM_RE.finditer(content):
+            specifiers.append([match.group(1), _PY_NAME_RE.findall(match.group(2))])
+        for match in _PY_IMPORT_RE.finditer(content):
+            specifiers.extend([part.split()[0], []] for part in match.group(1).split(",") if part.strip())
+    elif suffix in _JS_SUFFIXES:
+        for match in _JS_IMPORT_RE.finditer(content):
+            specifiers.append([match.group(1) or match.group(2) or match.group(3), []])
+    return specifiers
+
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+
+
+_PY_DEFINITION_RE = re.compile(r"^[ \t]*(?:async[ \t]+)?(?:def|class)[ \t]+([A-Za-z_][A-Za-z0-9_]*)[ \t]*[(:\[]", re.MULTILINE)
+_PY_CLASS_RE = re.compile(r"^[ \t]*class[ \t]+([A-Za-z_][A-Za-z0-9_]*)[ \t]*[(:\[]", re.MULTILINE)
+_JS_DECLARATION_RE = re.compile(
+    r"^[ \t]*(?:export[ \t]+)?(?:default[ \t]+)?(?:declare[ \t]+)?(?:abstract[ \t]+)?(?:async[ \t]+)?"
+    r"(function|class|const|let|var|interface|type|enum)(?:[ \t]*\*[ \t]*|[ \t]+)([A-Za-z_$][A-Za-z0-9_$]*)",
+    re.MULTILINE,
+)
+
+
+def _definitions(content: str, suffix: str) -> list[list[Any]]:
+    """[name, kind, line, signature] for each def/class (and JS/TS declaration), ordered by line."""
+    if suffix == ".py":
+        # Stricter than _FUNCTION_RE so docstring prose ("class that wraps ...") is not taken for a definition.
+        patterns = [(_PY_CLASS_RE, "class"), (_PY_DEFINITION_RE, "function")]
+    elif suffix in _JS_SUFFIXES:
+        patterns = [(_JS_DECLARATION_RE, None)]
+    elif suffix in {".rb", ".php"}:
+        patterns = [(_FUNCTION_RE, "function"), (_CLASS_RE, "class")]
+    else:
+        return []
+    index = _LineIndex(content)
+    found: dict[int, list[Any]] = {}
+    for regex, kind in patterns:
+        for match in regex.finditer(content):
+            # Patterns without a fixed kind capture the declaration keyword first and the name last.
+            group = match.lastindex or 1
+            line, _column = index.position(match.start(group))
+            if line not in found:
+                found[line] = [match.group(group), kind or match.group(1), line, index.lines(line, line)[0].strip()[:160]]
+    return [found[line] for line in sorted(found)]
+
+
+def _extract_symbols(content: str, suffix: str = "") -> dict[str, Any]:
+    imports = []
+    for match in _IMPORT_RE.finditer(content):
+        target = (match.group(1) or match.group(2) or "").split(",")[0].strip()
+        if target:
+            imports.append(target)
+    references: dict[str, int] = {}
+    for name in _IDENTIFIER_RE.findall(content):
+        references[name] = references.get(name, 0) + 1
+    return {
+        "functions": _FUNCTION_RE.findall(content),
+        "classes": _CLASS_RE.findall(content),
+        "symbols": _SYMBOL_RE.findall(content),
+        "imports": imports,
+        "specifiers": _import_specifiers(content, suffix),
+        "definitions": _definitions(content, suffix),
+        "references": references,
+    }
+
+
+class _SymbolCache:
+    """Per-file symbol/import records shared by codegraph, repomapper, lsmcp and filescope.
+
+    Records are keyed by absolute path and revalidated against (mtime_ns, size); with a cache dir they are
+    persisted to SQLite so a restarted adapter only re-extracts files that changed.
+    """
+
+    VERSION = 5
+
+    def __init__(self, db_path: pathlib.Path | None) -> None:
+        self._db_path = db_path
+        self._records: dict[str, tuple[int, int, dict[str, Any]]] = {}
+        self._dirty: set[str] = set()
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    def _connect(self) -> sqlite3.Connection | None:
+        if self._db_path is None:
+            return None
+        try:
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self._db_path))
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS symbols (path TEXT PRIMARY KEY, version INTEGER, mtime_ns INTEGER,"
+                " size INTEGER, record TEXT)"
+            )
+            return db
+        except (OSError, sqlite3.Error):
+            self._db_path = None
+            return None
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        db = self._connect()
+        if db is None:
+            return
+        try:
+            rows = db.execute(
+                "SELECT path, mtime_ns, size, record FROM symbols WHERE version = ?", (self.VERSION,)
+            ).fetchall()
+        except sqlite3.Error:
+            rows = []
+        finally:
+            db.close()
+        for path, mtime_ns, size, record in rows:
+            self._records.setdefault(path, (mtime_ns, size, json.loads(record)))
+
+    def record(self, path: pathlib.Path) -> dict[str, Any]:
+        key = str(path)
+        try:
+            stat = os.stat(key)
+        except OSError:
+            with self._lock:
+                if self._records.pop(key, None) is not None:
+                    self._dirty.add(key)
+            return {
+                "functions": [],
+                "classes": [],
+                "symbols": [],
+                "imports": [],
+                "specifiers": [],
+                "definitions": [],
+                "references": {},
+            }
+        with self._lock:
+            self._load()
+            cached = self._records.get(key)
+            if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                self._counters["hits"] += 1
+                return cached[2]
+            self._counters["misses"] += 1
+        record = _extract_symbols(_read_text(path), path.suffix.lower())
+        with self._lock:
+            self._records[key] = (stat.st_mtime_ns, stat.st_size, record)
+            self._dirty.add(key)
+        return record
+
+    def stale(self, path: pathlib.Path) -> bool:
+        """True when path changed on disk since its record was extracted (or was never extracted)."""
+        key = str(path)
+        try:
+            stat = os.stat(key)
+        except OSError:
+            return True
+        with self._lock:
+            cached = self._records.get(key)
+        return cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty or self._db_path is None:
+                self._dirty.clear()
+                return
+            changed = [(key, self._records.get(key)) for key in self._dirty]
+            self._dirty.clear()
+        db = self._connect()
+        if db is None:
+            return
+        try:
+            with db:
+                db.executemany(
+                    "DELETE FROM symbols WHERE path = ?", [(key,) for key, entry in changed if entry is None]
+                )
+                db.executemany(
+                    "INSERT OR REPLACE INTO symbols (path, version, mtime_ns, size, record) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (key, self.VERSION, entry[0], entry[1], json.dumps(entry[2], separators=(",", ":")))
+                        for key, entry in changed
+                        if entry is not None
+                    ],
+                )
+        except sqlite3.Error:
+            pass
+        finally:
+            db.close()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "files": len(self._records),
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "store": str(self._db_path) if self._db_path else None,
+                **self._counters,
+            }
+
+
+def _build_symbol_cache() -> _SymbolCache:
+    cache_dir = _cache_dir()
+    return _SymbolCache(cache_dir / "symbols.sqlite3" if cache_dir else None)
+
+
+_SYMBOLS = _build_symbol_cache()
+
+
+# (rule name, regex, literal prefixes every match must start with); rules without literals are "generic".
+_RuleSpec = tuple[tuple[str, str, tuple[str, ...]], ...]
+_SCAN_EXECUTOR: Executor | None = None
+_SCAN_WORKERS = 1
+_SCAN_EXECUTOR_LOCK = threading.Lock()
+
+
+def _scan_executor() -> tuple[Executor, bool, int]:
+    """(pool, is_process_pool, workers) for rule scans, created on first use."""
+    global _SCAN_EXECUTOR, _SCAN_WORKERS
+    with _SCAN_EXECUTOR_LOCK:
+        if _SCAN_EXECUTOR is None:
+            workers = max(1, _env_int("MCP_ADAPTER_SCAN_WORKERS", os.cpu_count() or 1))
+            # The regex engine holds the GIL, so threads only overlap file reads; processes are opt-in for
+            # CPU-bound scans on multi-core hosts. Forking this multi-threaded server could deadlock the
+            # children on inherited locks, so they start from a clean forkserver (spawn where unavailable).
+            if os.getenv("MCP_ADAPTER_SCAN_EXECUTOR", "").strip().lower() == "process":
+                methods = multiprocessing.get_all_start_methods()
+                _SCAN_EXECUTOR = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn"),
+                )
+            else:
+                _SCAN_EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="adapter-scan")
+            _SCAN_WORKERS = workers
+        return _SCAN_EXECUTOR, isinstance(_SCAN_EXECUTOR, ProcessPoolExecutor), _SCAN_WORKERS
+
+
+def _scoped_flags(pattern: str) -> str:
+    # Leading inline flags such as "(?i)" are only legal at the start of a whole regex.
+    match = re.match(r"\(\?([aiLmsux]+)\)", pattern)
+    if not match:
+        return pattern
+    return f"(?{match.group(1)}:{pattern[match.end():]})"
+
+
+class _MultiPatternMatcher:
+    """Run many rules as one literal prefilter pass plus one combined pass for literal-free rules.
+
+    Rules are only tried where a literal prefix or the combined pass hits; results equal per-rule ``finditer``.
+    """
+
+    def __init__(self, spec: _RuleSpec) -> None:
+        self.names = [name for name, _pattern, _literals in spec]
+        self._regexes = [re.compile(pattern) for _name, pattern, _literals in spec]
+        self._buckets: dict[str, list[tuple[str, list[int]]]] = {}
+        literal_rules: dict[str, list[int]] = {}
+        generic: list[int] = []
+        for index, (_name, _pattern, literals) in enumerate(spec):
+            if not literals:
+                generic.append(index)
+            for literal in literals:
+                literal_rules.setdefault(literal.lower(), []).append(index)
+        for literal, rule_ids in sorted(literal_rules.items(), key=lambda item: -len(item[0])):
+            self._buckets.setdefault(literal[0], []).append((literal, rule_ids))
+        # The prefilter runs case-sensitively over lowercased text; IGNORECASE alternations are several times slower.
+        self._prefilter = (
+            re.compile("|".join(re.escape(literal) for literal in literal_rules)) if literal_rules else None
+        )
+        self._prefilter_folded = (
+            re.compile("|".join(re.escape(literal) for literal in literal_rules), re.IGNORECASE)
+            if literal_rules
+            else None
+        )
+        self._generic = generic
+        self._combined = (
+            re.compile("|".join(f"(?P<r{index}>{_scoped_flags(spec[index][1])})" for index in generic))
+            if generic
+            else None
+        )
+
+    def matches(self, content: str) -> list[tuple[int, re.Match[str]]]:
+        found: list[tuple[int, re.Match[str]]] = []
+        last_end = [-1] * len(self._regexes)
+
+        def accept(index: int, match: re.Match[str] | None) -> None:
+            if match is None or match.start() < last_end[index]:
+                return
+            found.append((index, match))
+            # finditer resumes at the end of a match; empty matches advance by one.
+            last_end[index] = match.end() if match.end() > match.start() else match.start() + 1
+
+        if self._prefilter is not None:
+            lowered = content.lower()
+            # Some characters change length when lowercased; fall back to folding inside the regex.
+            haystack, prefilter = (
+                (lowered, self._prefilter) if len(lowered) == len(content) else (content, self._prefilter_folded)
+            )
+            hit = prefilter.search(haystack)
+            while hit is not None:
+                offset = hit.start()
+                for literal, rule_ids in self._buckets.get(content[offset].lower(), ()):
+                    if content[offset : offset + len(literal)].lower() != literal:
+                        continue
+                    for index in rule_ids:
+                        if offset >= last_end[index]:
+                            accept(index, self._regexes[index].match(content, offset))
+                hit = prefilter.search(haystack, offset + 1)
+        if self._combined is not None:
+            hit = self._combined.search(content)
+            while hit is not None:
+                offset = hit.start()
+                for index in self._generic:
+                    if offset >= last_end[index]:
+                        accept(index, self._regexes[index].match(content, offset))
+                hit = self._combined.search(content, offset + 1)
+        found.sort(key=lambda item: (item[0], item[1].start()))
+        return found
+
+
+@lru_cache(maxsize=16)
+def _compile_matcher(spec: _RuleSpec) -> _MultiPatternMatcher:
+    return _MultiPatternMatcher(spec)
+
+
+def _finding(
+    rule: str, rel: str, lines: _LineIndex, match: re.Match[str], context_lines: int = 0
+) -> dict[str, Any]:
+    line, column = lines.position(match.start())
+    finding: dict[str, Any] = {"rule": rule, "file": rel, "line": line, "column": column, "snippet": match.group(0)[:120]}
+    if context_lines > 0:
+        finding["context_start"] = max(1, line - context_lines)
+        finding["context"] = [text[:240] for text in lines.lines(line - context_lines, line + context_lines)]
+    return finding
+
+
+def _scan_file_rules(
+    spec: _RuleSpec, path: str, rel: str, content: str | None, limit: int, context_lines: int = 0
+) -> list[dict[str, Any]]:
+    if content is None:
+        content = _read_text(pathlib.Path(path))
+    matcher = _compile_matcher(spec)
+    lines = _LineIndex(content)
+    findings: list[dict[str, Any]] = []
+    for index, match in matcher.matches(content):
+        findings.append(_finding(matcher.names[index], rel, lines, match, context_lines))
+        if len(findings) >= limit:
+            break
+    return findings
+
+
+def _run_scan(
+    worker: Callable[..., list[dict[str, Any]]],
+    jobs: Iterable[tuple[Any, ...]],
+    cap: int,
+) -> list[dict[str, Any]]:
+    """Fan ``worker(*job)`` out over the scan pool, merging results in job order up to ``cap``."""
+    executor, _, workers = _scan_executor()
+    window = max(4, workers * 4)
+    pending: deque[Future[list[dict[str, Any]]]] = deque()
+    results: list[dict[str, Any]] = []
+    jobs_iter = iter(jobs)
     try:
-        return path.read_text(encoding="utf-8", errors="ignore")
-    except OSError:
-        return ""
+        while True:
+            while len(pending) < window:
+                job = next(jobs_iter, None)
+                if job is None:
+                    break
+                pending.append(executor.submit(worker, *job))
+            if not pending:
+                break
+            results.extend(pending.popleft().result())
+            if len(results) >= cap:
+                del results[cap:]
+                break
+    finally:
+        for future in pending:
+            future.cancel()
+    return results
+
+
+def _rule_jobs(
+    spec: _RuleSpec, root: pathlib.Path, paths: Iterable[pathlib.Path], cap: int, context_lines: int = 0
+) -> Iterator[tuple[Any, ...]]:
+    _, in_process_pool, _ = _scan_executor()
+    for path in paths:
+        rel = str(path.relative_to(root)).replace("\\", "/")
+        # Process workers cannot see this process's content cache, so ship them the text.
+        content = _read_text(path) if in_process_pool else None
+        yield spec, str(path), rel, content, cap, context_lines
+
+
+class _CursorStore:
+    """Server-side result cursors: large result sets are paged from one scan instead of truncated."""
+
+    def __init__(self, ttl_seconds: int, max_cursors: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_cursors = max_cursors
+        self._cursors: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        expired = [key for key, entry in self._cursors.items() if entry["expires_at"] <= now]
+        for key in expired:
+            self._close(self._cursors.pop(key))
+        while len(self._cursors) > self.max_cursors:
+            _key, entry = self._cursors.popitem(last=False)
+            self._close(entry)
+
+    @staticmethod
+    def _close(entry: dict[str, Any]) -> None:
+        close = getattr(entry["items"], "close", None)
+        if close is not None:
+            close()
+
+    def _take(self, entry: dict[str, Any]) -> tuple[list[Any], bool]:
+        page: list[Any] = []
+        if entry["lookahead"]:
+            page.append(entry["lookahead"].pop())
+        for item in entry["items"]:
+            page.append(item)
+            if len(page) >= entry["page_size"]:
+                break
+        # Pull one more item so the caller learns whether another page exists.
+        for item in entry["items"]:
+            entry["lookahead"].append(item)
+            break
+        return page, bool(entry["lookahead"])
+
+    def open(
+        self, kind: str, field: str, items: Iterable[Any], page_size: int, cursor_key: str = "next_cursor"
+    ) -> dict[str, Any]:
+        entry = {
+            "kind": kind,
+            "field": field,
+            "items": iter(items),
+            "lookahead": [],
+            "page_size": max(1, page_size),
+            "expires_at": time.monotonic() + self.ttl_seconds,
+        }
+        page, has_more = self._take(entry)
+        if not has_more:
+            return {field: page, cursor_key: None}
+        cursor = secrets.token_hex(8)
+        with self._lock:
+            self._evict()
+            self._cursors[cursor] = entry
+        return {field: page, cursor_key: cursor}
+
+    def next_page(self, kind: str, cursor: str) -> dict[str, Any]:
+        with self._lock:
+            self._evict()
+            entry = self._cursors.get(cursor)
+            if entry is None or entry["kind"] != kind:
+                return {"ok": False, "error": f"Unknown or expired cursor '{cursor}'. Re-run {kind}."}
+            del self._cursors[cursor]
+        page, has_more = self._take(entry)
+        next_cursor = None
+        if has_more:
+            entry["expires_at"] = time.monotonic() + self.ttl_seconds
+            next_cursor = secrets.token_hex(8)
+            with self._lock:
+                self._cursors[next_cursor] = entry
+        else:
+            self._close(entry)
+        return {"ok": True, entry["field"]: page, "next_cursor": next_cursor}
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._evict()
+            return {"open_cursors": len(self._cursors), "ttl_seconds": self.ttl_seconds}
+
+
+_CURSORS = _CursorStore(_env_int("MCP_ADAPTER_CURSOR_TTL_SECONDS", 600), _env_int("MCP_ADAPTER_MAX_CURSORS", 64))
+
+
+class _HttpPool:
+    """Shared keep-alive async HTTP client for the network adapters, with per-host concurrency limits."""
+
+    def __init__(self, max_connections: int, per_host: int) -> None:
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self._client: Any = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._stale: list[Any] = []
+        self._counters = {"requests": 0, "errors": 0, "retries": 0, "replaced_clients": 0}
+
+    def _get_client(self) -> Any:
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        # Connections and semaphores are bound to the loop that created them.
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                self._counters["replaced_clients"] += 1
+                old_loop = self._loop
+                if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+                    asyncio.run_coroutine_threadsafe(self._client.aclose(), old_loop)
+                else:
+                    self._stale.append(self._client)
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60,
+                ),
+                timeout=httpx.Timeout(30.0, connect=10.0),
+                follow_redirects=True,
+            )
+            self._loop = loop
+            self._host_limits = {}
+        return self._client
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        client = self._get_client()
+        while self._stale:
+            # The old loop is gone; closing from here releases what it can and lets the rest be collected.
+            try:
+                await self._stale.pop().aclose()
+            except Exception:  # noqa: BLE001
+                pass
+        host = urllib.parse.urlsplit(url).hostname or ""
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        async with limit:
+            self._counters["requests"] += 1
+            try:
+                return await client.request(method, url, **kwargs)
+            except Exception:
+                self._counters["errors"] += 1
+                raise
+
+    async def get(self, url: str, **kwargs: Any) -> Any:
+        return await self.request("GET", url, **kwargs)
+
+    async def get_with_backoff(self, url: str, attempts: int = 5, **kwargs: Any) -> Any:
+        """GET that retries 429 and 5xx responses, honoring ``Retry-After`` and otherwise backing off exponentially."""
+        response = None
+        for attempt in range(attempts):
+            response = await self.get(url, **kwargs)
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            if attempt == attempts - 1:
+                break
+            self._counters["retries"] += 1
+            try:
+                delay = float(response.headers.get("Retry-After", ""))
+            except ValueError:
+                delay = 0.5 * 2**attempt + random.uniform(0, 0.25)
+            await asyncio.sleep(min(delay, 30.0))
+        return response
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "per_host_limit": self.per_host,
+            "hosts": sorted(self._host_limits),
+            **self._counters,
+        }
+
+
+_HTTP = _HttpPool(_env_int("MCP_ADAPTER_HTTP_MAX_CONNECTIONS", 32), _env_int("MCP_ADAPTER_HTTP_PER_HOST", 6))
+# httpx logs every request at INFO, which buries the server log under one line per page and retry.
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class _ResponseCache:
+    """Two-tier (memory LRU + SQLite) TTL cache for upstream search responses, with stale-while-revalidate."""
+
+    def __init__(self, db_path: pathlib.Path | None, ttl_seconds: int, stale_seconds: int, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._db_path = db_path
+        self._db: sqlite3.Connection | None = None
+        self._memory: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: dict[str, asyncio.Task[dict[str, Any]]] = {}
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0}
+
+    @staticmethod
+    def key(namespace: str, query: str, params: dict[str, Any]) -> str:
+        normalized = " ".join(query.lower().split())
+        raw = json.dumps([namespace, normalized, params], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection | None:
+        if self._db is None and self._db_path is not None:
+            try:
+                self._db_path.parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(str(self._db_path), check_same_thread=False)
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, stored_at REAL, payload TEXT)"
+                )
+                db.commit()
+                self._db = db
+            except (OSError, sqlite3.Error):
+                self._db_path = None
+        return self._db
+
+    def _lookup(self, key: str) -> tuple[float, dict[str, Any]] | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return entry
+            db = self._connect()
+            if db is None:
+                return None
+            try:
+                row = db.execute("SELECT stored_at, payload FROM responses WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error:
+                return None
+            if row is None:
+                return None
+            entry = (row[0], json.loads(row[1]))
+            self._remember(key, entry)
+            self._counters["disk_hits"] += 1
+            return entry
+
+    def _remember(self, key: str, entry: tuple[float, dict[str, Any]]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _store(self, key: str, value: dict[str, Any]) -> None:
+        entry = (time.time(), value)
+        with self._lock:
+            self._remember(key, entry)
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, stored_at, payload) VALUES (?, ?, ?)",
+                    (key, entry[0], json.dumps(value)),
+                )
+                db.execute(
+                    "DELETE FROM responses WHERE stored_at < ?",
+                    (entry[0] - self.ttl_seconds - self.stale_seconds,),
+                )
+                db.commit()
+            except sqlite3.Error:
+                pass
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[dict[str, Any]]]) -> dict[str, Any]:
+        # Concurrent misses and refreshes for the same key share one upstream request.
+        task = self._inflight.get(key)
+        if task is None:
+
+            async def run() -> dict[str, Any]:
+                try:
+                    value = await loader()
+                    if value.get("ok"):
+                        self._store(key, value)
+                    return value
+                finally:
+                    self._inflight.pop(key, None)
+
+            task = asyncio.get_running_loop().create_task(run())
+            self._inflight[key] = task
+        return await task
+
+    async def fetch(
+        self,
+        namespace: str,
+        query: str,
+        params: dict[str, Any],
+        loader: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> dict[str, Any]:
+        key = self.key(namespace, query, params)
+        entry = self._lookup(key)
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age <= self.ttl_seconds:
+                return {**entry[1], "query": query, "cache": "hit", "cache_age_seconds": round(age, 3)}
+            if age <= self.ttl_seconds + self.stale_seconds:
+                self._counters["stale_hits"] += 1
+                if key not in self._inflight:
+                    self._counters["refreshes"] += 1
+                    asyncio.get_running_loop().create_task(self._load(key, loader))
+                return {**entry[1], "query": query, "cache": "stale", "cache_age_seconds": round(age, 3)}
+        self._counters["misses"] += 1
+        value = await self._load(key, loader)
+        return {**value, "query": query, "cache": "miss"}
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            disk_entries = None
+            db = self._connect()
+            if db is not None:
+                try:
+                    disk_entries = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "stale_seconds": self.stale_seconds,
+                **self._counters,
+            }
+
+
+def _build_response_cache() -> _ResponseCache:
+    cache_dir = _cache_dir()
+    return _ResponseCache(
+        cache_dir / "responses.sqlite3" if cache_dir else None,
+        _env_int("MCP_ADAPTER_SEARCH_TTL_SECONDS", 3600),
+        _env_int("MCP_ADAPTER_SEARCH_STALE_SECONDS", 86400),
+        _env_int("MCP_ADAPTER_SEARCH_CACHE_ENTRIES", 512),
+    )
 
 
-def _line_number(content: str, offset: int) -> int:
-    return content.count("\n", 0, offset) + 1
+_RESPONSES = _build_response_cache()
 
 
 def register_augments(mcp: FastMCP) -> None:
@@ -109,17 +1326,14 @@ def register_augments(mcp: FastMCP) -> None:
 
 
 def register_arxiv(mcp: FastMCP) -> None:
-    import requests
+    import httpx  # noqa: F401
 
-    @mcp.tool()
-    def arxiv_search(query: str, max_results: int = 10) -> dict[str, Any]:
-        limit = max(1, min(max_results, 25))
-        response = requests.get(
-            "http://export.arxiv.org/api/query",
+    async def _search(query: str, limit: int) -> dict[str, Any]:
+        response = await _HTTP.get(
+            os.getenv("ARXIV_API_URL", "").strip() or "http://export.arxiv.org/api/query",
             params={"search_query": f"all:{query}", "start": 0, "max_results": limit},
-            timeout=30,
         )
-        if not response.ok:
+        if not response.is_success:
             return {"ok": False, "status_code": response.status_code, "error": response.text[:400]}
         root = ET.fromstring(response.text)
         namespace = {"atom": "http://www.w3.org/2005/Atom"}
@@ -134,24 +1348,21 @@ def register_arxiv(mcp: FastMCP) -> None:
             )
         return {"ok": True, "query": query, "count": len(entries), "results": entries}
 
+    @mcp.tool()
+    async def arxiv_search(query: str, max_results: int = 10) -> dict[str, Any]:
+        limit = max(1, min(max_results, 25))
+        return await _RESPONSES.fetch("arxiv", query, {"max_results": limit}, lambda: _search(query, limit))
+
 
 def register_searxng(mcp: FastMCP) -> None:
-    import requests
+    import httpx  # noqa: F401
 
-    @mcp.tool()
-    def searxng_search(query: str, page: int = 1) -> dict[str, Any]:
-        base_url = os.getenv("SEARXNG_URL", "").strip()
-        if not base_url or base_url == "<UNKNOWN>":
-            return {
-                "ok": False,
-                "error": "SEARXNG_URL is not configured. Set searxng.url secret or SEARXNG_URL.",
-            }
-        response = requests.get(
+    async def _search(base_url: str, query: str, page: int) -> dict[str, Any]:
+        response = await _HTTP.get(
             f"{base_url.rstrip('/')}/search",
-            params={"q": query, "format": "json", "pageno": max(1, page)},
-            timeout=30,
+            params={"q": query, "format": "json", "pageno": page},
         )
-        if not response.ok:
+        if not response.is_success:
             return {"ok": False, "status_code": response.status_code, "error": response.text[:400]}
         data = response.json()
         results = data.get("results", [])[:15]
@@ -161,10 +1372,22 @@ def register_searxng(mcp: FastMCP) -> None:
         ]
         return {"ok": True, "query": query, "result_count": len(normalized), "results": normalized}
 
-
-def register_nexus(mcp: FastMCP) -> None:
     @mcp.tool()
-    def nexus_health() -> dict[str, Any]:
+    async def searxng_search(query: str, page: int = 1) -> dict[str, Any]:
+        base_url = os.getenv("SEARXNG_URL", "").strip()
+        if not base_url or base_url == "<UNKNOWN>":
+            return {
+                "ok": False,
+                "error": "SEARXNG_URL is not configured. Set searxng.url secret or SEARXNG_URL.",
+            }
+        page = max(1, page)
+        params = {"base_url": base_url, "page": page}
+        return await _RESPONSES.fetch("searxng", query, params, lambda: _search(base_url, query, page))
+
+
+def register_nexus(mcp: FastMCP) -> None:
+    @mcp.tool()
+    def nexus_health() -> dict[str, Any]:
         key = os.getenv("OPENROUTER_API_KEY") or os.getenv("NEXUS_API_KEY")
         return {"ok": bool(key and key != "<UNKNOWN>"), "has_api_key": bool(key and key != "<UNKNOWN>")}
 
@@ -185,7 +1408,11 @@ def register_nexus(mcp: FastMCP) -> None:
 
 
 def register_cloudflare(mcp: FastMCP) -> None:
-    import requests
+    import httpx  # noqa: F401
+
+    def _api_url(path: str) -> str:
+        base = os.getenv("CLOUDFLARE_API_URL", "").strip() or "https://api.cloudflare.com/client/v4"
+        return f"{base.rstrip('/')}/{path.lstrip('/')}"
 
     def _headers() -> dict[str, str]:
         token = os.getenv("CLOUDFLARE_API_TOKEN", "").strip()
@@ -204,70 +1431,485 @@ def register_cloudflare(mcp: FastMCP) -> None:
             "message": "Set CLOUDFLARE_API_TOKEN for live API access.",
         }
 
+    async def _zones_page(headers: dict[str, str], page: int, per_page: int) -> tuple[Any, dict[str, Any]]:
+        response = await _HTTP.get_with_backoff(
+            _api_url("zones"),
+            headers=headers,
+            params={"page": page, "per_page": per_page},
+        )
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        return response, data if isinstance(data, dict) else {}
+
     @mcp.tool()
-    def cloudflare_list_zones(page: int = 1, per_page: int = 20) -> dict[str, Any]:
+    async def cloudflare_list_zones(page: int = 1, per_page: int = 20, all_pages: bool = False) -> dict[str, Any]:
         headers = _headers()
         if not headers:
             return {"ok": False, "error": "Missing CLOUDFLARE_API_TOKEN"}
-        response = requests.get(
-            "https://api.cloudflare.com/client/v4/zones",
-            headers=headers,
-            timeout=30,
-            params={"page": max(page, 1), "per_page": max(1, min(per_page, 50))},
-        )
-        data = response.json()
-        zones = [
-            {"id": z.get("id"), "name": z.get("name"), "status": z.get("status")}
-            for z in data.get("result", [])
-        ]
-        return {"ok": response.ok, "zones": zones, "status_code": response.status_code}
+        per_page = max(1, min(per_page, 50))
+        if all_pages:
+            per_page = 50
+        response, data = await _zones_page(headers, 1 if all_pages else max(page, 1), per_page)
+        pages = [data]
+        failed_pages: list[int] = []
+        total_pages = 1
+        if all_pages and response.is_success:
+            total_pages = int((data.get("result_info") or {}).get("total_pages") or 1)
+            limit = asyncio.Semaphore(max(1, _env_int("MCP_ADAPTER_CLOUDFLARE_CONCURRENCY", 4)))
+
+            async def fetch(number: int) -> tuple[int, Any, dict[str, Any]]:
+                async with limit:
+                    return (number, *await _zones_page(headers, number, per_page))
+
+            for number, page_response, page_data in await asyncio.gather(
+                *(fetch(number) for number in range(2, total_pages + 1))
+            ):
+                if page_response.is_success:
+                    pages.append(page_data)
+                else:
+                    failed_pages.append(number)
+        zones: list[dict[str, Any]] = []
+        seen: set[Any] = set()
+        for page_data in pages:
+            for z in page_data.get("result") or []:
+                if z.get("id") in seen:
+                    continue
+                seen.add(z.get("id"))
+                zones.append({"id": z.get("id"), "name": z.get("name"), "status": z.get("status")})
+        payload: dict[str, Any] = {
+            "ok": response.is_success and not failed_pages,
+            "zones": zones,
+            "status_code": response.status_code,
+        }
+        if all_pages:
+            payload.update({"page_count": total_pages, "zone_count": len(zones), "failed_pages": failed_pages})
+        return payload
 
     @mcp.tool()
-    def cloudflare_get_account() -> dict[str, Any]:
+    async def cloudflare_get_account() -> dict[str, Any]:
         headers = _headers()
         account_id = os.getenv("CLOUDFLARE_ACCOUNT_ID", "").strip()
         if not headers:
             return {"ok": False, "error": "Missing CLOUDFLARE_API_TOKEN"}
         if not account_id:
             return {"ok": False, "error": "Missing CLOUDFLARE_ACCOUNT_ID"}
-        response = requests.get(
-            f"https://api.cloudflare.com/client/v4/accounts/{account_id}",
-            headers=headers,
-            timeout=30,
-        )
+        response = await _HTTP.get(_api_url(f"accounts/{account_id}"), headers=headers)
         payload = response.json()
         result = payload.get("result") if isinstance(payload, dict) else None
-        return {"ok": response.ok, "account": result, "status_code": response.status_code}
+        return {"ok": response.is_success, "account": result, "status_code": response.status_code}
 
 
-def register_filescope(mcp: FastMCP) -> None:
-    import_re = re.compile(
-        r"^\s*(?:from\s+([A-Za-z0-9_./-]+)\s+import|import\s+([A-Za-z0-9_.,\s/-]+))",
-        re.MULTILINE,
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ONLYDIR = 0x1000000
+_IN_ISDIR = 0x40000000
+
+
+class _Inotify:
+    """Minimal inotify(7) binding over ctypes; raises OSError where inotify is unavailable."""
+
+    MASK = (
+        _IN_MODIFY
+        | _IN_CLOSE_WRITE
+        | _IN_MOVED_FROM
+        | _IN_MOVED_TO
+        | _IN_CREATE
+        | _IN_DELETE
+        | _IN_DELETE_SELF
+        | _IN_MOVE_SELF
+        | _IN_ONLYDIR
     )
 
+    def __init__(self) -> None:
+        import ctypes
+        import ctypes.util
+
+        self._ctypes = ctypes
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            self._add_watch = libc.inotify_add_watch
+            init = libc.inotify_init1
+        except (OSError, AttributeError) as exc:
+            raise OSError(f"inotify is not available: {exc}") from exc
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            self._raise()
+        self.directories: dict[int, str] = {}
+        self._watches: dict[str, int] = {}
+
+    def _raise(self) -> None:
+        errno = self._ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+    def watch(self, directory: str) -> None:
+        if directory in self._watches:
+            return
+        descriptor = self._add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if descriptor < 0:
+            self._raise()
+        self.directories[descriptor] = directory
+        self._watches[directory] = descriptor
+
+    def read(self, timeout: float) -> list[tuple[str, int, str]]:
+        """(directory, mask, name) for the events queued within timeout seconds; [] when none arrived."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + 16 <= len(data):
+            descriptor, mask, _cookie, length = struct.unpack_from("iIII", data, offset)
+            name = data[offset + 16 : offset + 16 + length].split(b"\0", 1)[0]
+            offset += 16 + length
+            if mask & _IN_IGNORED:
+                directory = self.directories.pop(descriptor, None)
+                if directory is not None:
+                    self._watches.pop(directory, None)
+                continue
+            events.append((self.directories.get(descriptor, ""), mask, os.fsdecode(name)))
+        return events
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class _FilescopeWatch:
+    """Live per-file import counts for one root, kept current by inotify (or stat polling) instead of a rescan.
+
+    Event bursts such as a git checkout are debounced into one batch. Batches that are too large, touch
+    directories or ignore files, or overflow the kernel queue become a full resync, which stays cheap
+    because the directory listing and the symbol records are both cached.
+    """
+
+    def __init__(
+        self, root: pathlib.Path, max_files: int, debounce: float, poll_interval: float, burst: int
+    ) -> None:
+        self.root = root
+        self.max_files = max_files
+        self._debounce = debounce
+        self._poll_interval = poll_interval
+        self._burst = burst
+        self._files: dict[str, tuple[int, int, list[str]]] = {}
+        self._counts: Counter[str] = Counter()
+        self._changes: deque[tuple[int, str, str, float]] = deque(maxlen=5000)
+        self._lock = threading.Lock()
+        self._epoch = secrets.token_hex(4)
+        self._seq = 0
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._inotify: _Inotify | None = None
+        self.backend = "poll"
+        self.pruned_dirs = 0
+        self.truncated = False
+        self._counters = {"events": 0, "batches": 0, "resyncs": 0, "updates": 0, "errors": 0}
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="filescope-watch", daemon=True)
+            self._thread.start()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        return self._ready.wait(timeout)
+
+    @property
+    def live(self) -> bool:
+        return self._ready.is_set() and not self._stop.is_set() and self._thread is not None and self._thread.is_alive()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _record(self, rel: str, action: str) -> None:
+        self._seq += 1
+        self._changes.append((self._seq, rel, action, time.time()))
+
+    def _remove(self, rel: str, log: bool) -> None:
+        with self._lock:
+            old = self._files.pop(rel, None)
+            if old is None:
+                return
+            self._counts.subtract(old[2])
+            for dep in old[2]:
+                if self._counts[dep] <= 0:
+                    del self._counts[dep]
+            if log:
+                self._record(rel, "removed")
+
+    def _refresh(self, rel: str, path: pathlib.Path, log: bool) -> None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._remove(rel, log)
+            return
+        if not os.path.isfile(path) or stat.st_size > _SCAN_MAX_BYTES:
+            self._remove(rel, log)
+            return
+        old = self._files.get(rel)
+        if old is not None and old[:2] == (stat.st_mtime_ns, stat.st_size):
+            return
+        imports = list(_SYMBOLS.record(path)["imports"])
+        with self._lock:
+            if old is not None:
+                self._counts.subtract(old[2])
+                for dep in old[2]:
+                    if self._counts[dep] <= 0:
+                        del self._counts[dep]
+            self._counts.update(imports)
+            self._files[rel] = (stat.st_mtime_ns, stat.st_size, imports)
+            self._counters["updates"] += 1
+            if log:
+                self._record(rel, "modified" if old is not None else "added")
+
+    def _sync(self, log: bool = True) -> None:
+        walk: dict[str, int] = {}
+        directories: list[str] = []
+        current: dict[str, pathlib.Path] = {}
+        truncated = False
+        for path in _walk_files(self.root, walk, directories):
+            if path.suffix.lower() not in TEXT_EXTENSIONS:
+                continue
+            try:
+                if os.stat(path).st_size > _SCAN_MAX_BYTES:
+                    continue
+            except OSError:
+                continue
+            if len(current) >= self.max_files:
+                truncated = True
+                break
+            current[str(path.relative_to(self.root)).replace("\\", "/")] = path
+        for rel in self._files.keys() - current.keys():
+            self._remove(rel, log)
+        for rel, path in current.items():
+            self._refresh(rel, path, log)
+        _SYMBOLS.flush()
+        self.pruned_dirs = walk["pruned_dirs"]
+        self.truncated = truncated
+        self._counters["resyncs"] += 1
+        if self._inotify is not None:
+            for directory in directories:
+                self._inotify.watch(directory)
+
+    def _apply(self, paths: set[str]) -> None:
+        for name in sorted(paths):
+            path = pathlib.Path(name)
+            rel = str(path.relative_to(self.root)).replace("\\", "/")
+            if rel not in self._files:
+                # Files the walk never saw still have to pass its filters before they are counted.
+                if path.suffix.lower() not in TEXT_EXTENSIONS or not path.is_file():
+                    continue
+                if _is_ignored(_inherited_rules(path), name, is_dir=False):
+                    continue
+                if len(self._files) >= self.max_files:
+                    self.truncated = True
+                    continue
+            self._refresh(rel, path, True)
+        _SYMBOLS.flush()
+
+    def _drain(self, inotify: _Inotify) -> None:
+        events = inotify.read(1.0)
+        if not events:
+            return
+        pending: set[str] = set()
+        resync = False
+        deadline = time.monotonic() + max(2.0, self._debounce * 8)
+        while events:
+            for directory, mask, name in events:
+                self._counters["events"] += 1
+                if mask & (_IN_Q_OVERFLOW | _IN_DELETE_SELF | _IN_MOVE_SELF):
+                    resync = True
+                elif mask & _IN_ISDIR:
+                    resync = resync or name not in IGNORED_DIR_NAMES
+                elif name in IGNORE_FILE_NAMES:
+                    resync = True
+                elif directory and name:
+                    pending.add(os.path.join(directory, name))
+            if time.monotonic() >= deadline:
+                break
+            # Keep collecting until the tree has been quiet for one debounce interval.
+            events = inotify.read(self._debounce)
+        self._counters["batches"] += 1
+        if resync or len(pending) > self._burst:
+            self._sync()
+        else:
+            self._apply(pending)
+
+    def _run(self) -> None:
+        try:
+            self._inotify = _Inotify()
+            self.backend = "inotify"
+        except OSError:
+            self._inotify = None
+        try:
+            try:
+                self._sync(log=False)
+            except OSError:
+                # Typically the inotify watch limit; stat polling still keeps the counts current.
+                self._close_inotify()
+                self._sync(log=False)
+        except Exception:  # noqa: BLE001
+            self._counters["errors"] += 1
+            self._stop.set()
+        self._ready.set()
+        while not self._stop.is_set():
+            try:
+                if self._inotify is not None:
+                    self._drain(self._inotify)
+                elif not self._stop.wait(self._poll_interval):
+                    self._sync()
+            except OSError:
+                self._close_inotify()
+            except Exception:  # noqa: BLE001
+                self._counters["errors"] += 1
+                self._stop.wait(1.0)
+        self._close_inotify()
+
+    def _close_inotify(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self.backend = "poll"
+
+    def covers(self, max_files: int) -> bool:
+        """Whether the live state is what a walk capped at max_files would count."""
+        with self._lock:
+            return max_files == self.max_files or (not self.truncated and len(self._files) <= max_files)
+
+    def scan(self) -> dict[str, Any]:
+        with self._lock:
+            top = heapq.nlargest(30, self._counts.items(), key=lambda item: item[1])
+            return {"files_scanned": len(self._files), "pruned_dirs": self.pruned_dirs, "top_dependencies": top}
+
+    def changes(self, token: str, limit: int) -> dict[str, Any]:
+        """Changes after token (oldest first, at most limit), or the latest limit changes without a token."""
+        with self._lock:
+            if not token:
+                items = list(self._changes)[-limit:]
+            else:
+                epoch, _, seq_text = token.partition(":")
+                oldest = self._changes[0][0] if self._changes else self._seq + 1
+                try:
+                    seq = int(seq_text)
+                except ValueError:
+                    seq = -1
+                if epoch != self._epoch or seq < 0 or seq > self._seq or seq + 1 < oldest:
+                    return {"token": f"{self._epoch}:{self._seq}", "changes": [], "resync_required": True}
+                items = [item for item in self._changes if item[0] > seq][:limit]
+            last = items[-1][0] if items and token else self._seq
+            more = bool(items) and items[-1][0] < self._seq and bool(token)
+        return {
+            "token": f"{self._epoch}:{last}",
+            "changes": [{"file": rel, "action": action, "time": stamp} for _number, rel, action, stamp in items],
+            "has_more": more,
+            "resync_required": False,
+        }
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "live": self.live,
+                "backend": self.backend,
+                "files": len(self._files),
+                "dependencies": len(self._counts),
+                "watched_dirs": len(self._inotify.directories) if self._inotify is not None else 0,
+                "truncated": self.truncated,
+                "sequence": self._seq,
+                **self._counters,
+            }
+
+
+_FILESCOPE_WATCHES: OrderedDict[str, _FilescopeWatch] = OrderedDict()
+_FILESCOPE_WATCH_LIMIT = 4
+
+
+def _start_filescope_watch(root: pathlib.Path, max_files: int) -> _FilescopeWatch:
+    watch = _FilescopeWatch(
+        root,
+        max_files,
+        _env_int("MCP_ADAPTER_WATCH_DEBOUNCE_MS", 250) / 1000,
+        max(1, _env_int("MCP_ADAPTER_WATCH_POLL_SECONDS", 2)),
+        _env_int("MCP_ADAPTER_WATCH_BURST", 500),
+    )
+    _FILESCOPE_WATCHES[str(root)] = watch
+    while len(_FILESCOPE_WATCHES) > _FILESCOPE_WATCH_LIMIT:
+        _FILESCOPE_WATCHES.popitem(last=False)[1].stop()
+    watch.start()
+    return watch
+
+
+def register_filescope(mcp: FastMCP) -> None:
+    if os.getenv("MCP_ADAPTER_FILESCOPE_WATCH", "0").strip() == "1":
+        _start_filescope_watch(_to_safe_root(ROOT_DEFAULT), _env_int("MCP_ADAPTER_WATCH_MAX_FILES", 20000))
+
     @mcp.tool()
-    def filescope_scan(root_path: str = ROOT_DEFAULT, max_files: int = 800) -> dict[str, Any]:
+    def filescope_scan(root_path: str = ROOT_DEFAULT, max_files: int = 800, watch: bool = False) -> dict[str, Any]:
         root = _to_safe_root(root_path)
+        state = _FILESCOPE_WATCHES.get(str(root))
+        if state is not None and state.wait_ready(0) and not state.live:
+            _FILESCOPE_WATCHES.pop(str(root), None)
+            state = None
+        if state is None and watch:
+            state = _start_filescope_watch(root, max_files)
+        if state is not None and watch:
+            state.wait_ready()
+            if state.live and not state.covers(max_files):
+                return {
+                    "ok": False,
+                    "error": f"{root} is already watched with max_files={state.max_files}; "
+                    "pass that value, or omit watch for a one-off scan.",
+                }
+        if state is not None and state.live and state.covers(max_files):
+            return {"root": str(root), **state.scan(), "live": True, "watch": state.stats()}
         edge_counts: dict[str, int] = {}
         scanned = 0
-        for path in _iter_files(root, max_files):
+        walk: dict[str, int] = {}
+        for path in _iter_files(root, max_files, stats=walk):
             scanned += 1
-            content = _read_text(path)
-            for match in import_re.finditer(content):
-                dep = (match.group(1) or match.group(2) or "").split(",")[0].strip()
-                if not dep:
-                    continue
+            for dep in _SYMBOLS.record(path)["imports"]:
                 edge_counts[dep] = edge_counts.get(dep, 0) + 1
+        _SYMBOLS.flush()
         top = sorted(edge_counts.items(), key=lambda item: item[1], reverse=True)[:30]
-        return {"root": str(root), "files_scanned": scanned, "top_dependencies": top}
+        return {
+            "root": str(root),
+            "files_scanned": scanned,
+            "pruned_dirs": walk["pruned_dirs"],
+            "top_dependencies": top,
+            "live": False,
+        }
+
+    @mcp.tool()
+    def filescope_changes(root_path: str = ROOT_DEFAULT, token: str = "", limit: int = 100) -> dict[str, Any]:
+        root = _to_safe_root(root_path)
+        state = _FILESCOPE_WATCHES.get(str(root))
+        if state is None or not state.live:
+            return {"ok": False, "error": f"{root} is not being watched; call filescope_scan with watch=true first."}
+        return {"ok": True, "root": str(root), "backend": state.backend, **state.changes(token, max(1, min(limit, 1000)))}
 
     @mcp.tool()
     def filescope_priority_files(root_path: str = ROOT_DEFAULT, max_files: int = 1200) -> dict[str, Any]:
         root = _to_safe_root(root_path)
         scored: list[tuple[int, str]] = []
         hot_names = ("index", "main", "app", "server", "routes", "router", "config")
-        for path in _iter_files(root, max_files):
+        walk: dict[str, int] = {}
+        for path in _iter_files(root, max_files, stats=walk):
             rel = str(path.relative_to(root)).replace("\\", "/")
             name = path.stem.lower()
             score = 0
@@ -281,44 +1923,39 @@ def register_filescope(mcp: FastMCP) -> None:
                 score -= 1
             scored.append((score, rel))
         top = [entry[1] for entry in sorted(scored, reverse=True)[:40]]
-        return {"root": str(root), "important_files": top}
+        return {"root": str(root), "important_files": top, "pruned_dirs": walk["pruned_dirs"]}
 
 
 def register_gitleaks(mcp: FastMCP) -> None:
-    patterns = {
-        "aws_access_key": re.compile(r"\b(AKIA|ASIA)[A-Z0-9]{16}\b"),
-        "github_token": re.compile(r"\bgh[pousr]_[A-Za-z0-9]{36,255}\b"),
-        "slack_token": re.compile(r"\bxox[baprs]-[A-Za-z0-9-]{10,}\b"),
-        "private_key": re.compile(r"-----BEGIN (?:RSA|EC|OPENSSH|PRIVATE) KEY-----"),
-        "generic_api_key": re.compile(
-            r"(?i)\b(api[_-]?key|secret|token)\b\s*[:=]\s*['\"]?[A-Za-z0-9_\-]{16,}"
+    patterns: _RuleSpec = (
+        ("aws_access_key", r"\b(AKIA|ASIA)[A-Z0-9]{16}\b", ("AKIA", "ASIA")),
+        ("github_token", r"\bgh[pousr]_[A-Za-z0-9]{36,255}\b", ("ghp_", "gho_", "ghu_", "ghs_", "ghr_")),
+        ("slack_token", r"\bxox[baprs]-[A-Za-z0-9-]{10,}\b", ("xoxb-", "xoxa-", "xoxp-", "xoxr-", "xoxs-")),
+        ("private_key", r"-----BEGIN (?:RSA|EC|OPENSSH|PRIVATE) KEY-----", ("-----BEGIN ",)),
+        (
+            "generic_api_key",
+            r"(?i)\b(api[_-]?key|secret|token)\b\s*[:=]\s*['\"]?[A-Za-z0-9_\-]{16,}",
+            ("api", "secret", "token"),
         ),
-    }
+    )
 
     @mcp.tool()
-    def gitleaks_scan(root_path: str = ROOT_DEFAULT, max_files: int = 2000) -> dict[str, Any]:
+    def gitleaks_scan(root_path: str = ROOT_DEFAULT, max_files: int = 2000, context_lines: int = 0) -> dict[str, Any]:
         root = _to_safe_root(root_path)
-        findings: list[dict[str, Any]] = []
-        for path in _iter_files(root, max_files, max_size_bytes=256 * 1024):
-            rel = str(path.relative_to(root)).replace("\\", "/")
-            content = _read_text(path)
-            for key, regex in patterns.items():
-                for match in regex.finditer(content):
-                    findings.append(
-                        {
-                            "rule": key,
-                            "file": rel,
-                            "line": _line_number(content, match.start()),
-                            "snippet": match.group(0)[:120],
-                        }
-                    )
-                    if len(findings) >= 300:
-                        break
-                if len(findings) >= 300:
-                    break
-            if len(findings) >= 300:
-                break
-        return {"root": str(root), "finding_count": len(findings), "findings": findings[:80]}
+        walk: dict[str, int] = {}
+        paths = _iter_files(root, max_files, max_size_bytes=256 * 1024, stats=walk)
+        jobs = _rule_jobs(patterns, root, paths, 300, max(0, min(context_lines, 10)))
+        findings = _run_scan(_scan_file_rules, jobs, 300)
+        return {
+            "root": str(root),
+            "finding_count": len(findings),
+            "pruned_dirs": walk["pruned_dirs"],
+            **_CURSORS.open("gitleaks_scan", "findings", findings, 80),
+        }
+
+    @mcp.tool()
+    def gitleaks_scan_next(cursor: str) -> dict[str, Any]:
+        return _CURSORS.next_page("gitleaks_scan", cursor)
 
 
 def register_react(mcp: FastMCP) -> None:
@@ -326,13 +1963,21 @@ def register_react(mcp: FastMCP) -> None:
     def react_list_components(root_path: str = ROOT_DEFAULT, max_files: int = 1000) -> dict[str, Any]:
         root = _to_safe_root(root_path)
         components: list[str] = []
-        for path in _iter_files(root, max_files):
-            if path.suffix.lower() not in {".jsx", ".tsx"}:
-                continue
+        walk: dict[str, int] = {}
+        for path in _iter_files(root, max_files, suffixes={".jsx", ".tsx"}, stats=walk):
             content = _read_text(path)
             if "React" in content or "export default" in content or "function " in content:
                 components.append(str(path.relative_to(root)).replace("\\", "/"))
-        return {"root": str(root), "components": components[:300], "count": len(components)}
+        return {
+            "root": str(root),
+            "count": len(components),
+            "pruned_dirs": walk["pruned_dirs"],
+            **_CURSORS.open("react_list_components", "components", components, 300),
+        }
+
+    @mcp.tool()
+    def react_list_components_next(cursor: str) -> dict[str, Any]:
+        return _CURSORS.next_page("react_list_components", cursor)
 
     @mcp.tool()
     def react_create_component(
@@ -354,221 +1999,2110 @@ def register_react(mcp: FastMCP) -> None:
                 "}\n"
             )
         else:
-            content = (
-                f"export function {component_name}({{ className }}) {{\n"
-                "  return <div className={className}>TODO: implement</div>;\n"
-                "}\n"
+            content = (
+                f"export function {component_name}({{ className }}) {{\n"
+                "  return <div className={className}>TODO: implement</div>;\n"
+                "}\n"
+            )
+        target.write_text(content, encoding="utf-8")
+        return {"ok": True, "file": str(target)}
+
+    @mcp.tool()
+    def react_update_component(file_path: str, content: str) -> dict[str, Any]:
+        target = _to_safe_root(file_path)
+        if not target.exists():
+            return {"ok": False, "error": f"{target} does not exist"}
+        target.write_text(content, encoding="utf-8")
+        return {"ok": True, "file": str(target), "bytes": len(content.encode("utf-8"))}
+
+
+def register_vue(mcp: FastMCP) -> None:
+    @mcp.tool()
+    def vue_list_components(root_path: str = ROOT_DEFAULT, max_files: int = 1000) -> dict[str, Any]:
+        root = _to_safe_root(root_path)
+        components: list[str] = []
+        walk: dict[str, int] = {}
+        for path in _iter_files(root, max_files, suffixes={".vue"}, stats=walk):
+            components.append(str(path.relative_to(root)).replace("\\", "/"))
+        return {
+            "root": str(root),
+            "count": len(components),
+            "pruned_dirs": walk["pruned_dirs"],
+            **_CURSORS.open("vue_list_components", "components", components, 400),
+        }
+
+    @mcp.tool()
+    def vue_list_components_next(cursor: str) -> dict[str, Any]:
+        return _CURSORS.next_page("vue_list_components", cursor)
+
+    @mcp.tool()
+    def vue_create_component(component_name: str, directory: str = f"{ROOT_DEFAULT}/src/components") -> dict[str, Any]:
+        safe_dir = _to_safe_root(directory)
+        safe_dir.mkdir(parents=True, exist_ok=True)
+        target = safe_dir / f"{component_name}.vue"
+        if target.exists():
+            return {"ok": False, "error": f"{target} already exists"}
+        content = (
+            "<template>\n"
+            "  <div class=\"component-root\">TODO: implement</div>\n"
+            "</template>\n\n"
+            "<script setup lang=\"ts\">\n"
+            "</script>\n\n"
+            "<style scoped>\n"
+            ".component-root {\n"
+            "}\n"
+            "</style>\n"
+        )
+        target.write_text(content, encoding="utf-8")
+        return {"ok": True, "file": str(target)}
+
+
+def register_shadcn(mcp: FastMCP) -> None:
+    presets = {
+        "button": "export function Button() { return <button className=\"px-4 py-2 rounded-md border\">Button</button>; }",
+        "card": "export function Card({ children }) { return <div className=\"rounded-xl border p-4 shadow-sm\">{children}</div>; }",
+        "badge": "export function Badge({ children }) { return <span className=\"rounded-full border px-2 py-0.5 text-xs\">{children}</span>; }",
+    }
+
+    @mcp.tool()
+    def shadcn_list_components() -> dict[str, Any]:
+        return {"components": sorted(presets.keys())}
+
+    @mcp.tool()
+    def shadcn_get_component(name: str) -> dict[str, Any]:
+        key = name.strip().lower()
+        if key not in presets:
+            return {"ok": False, "error": f"Unknown component '{name}'", "available": sorted(presets.keys())}
+        return {"ok": True, "name": key, "tsx": presets[key]}
+
+
+_LSMCP_SUFFIXES = {".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs"}
+_SYMBOL_TABLE_LIMIT = 8
+# Revalidating a table stats every walked directory and file, so queries share one pass per interval.
+_SYMBOL_RECHECK_SECONDS = _env_int("MCP_ADAPTER_SYMBOL_RECHECK_MS", 2000) / 1000
+
+
+def _trigrams(name: str) -> set[str]:
+    padded = f"${name}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class _SymbolTable:
+    """In-memory definitions of one workspace for lsmcp_find_symbol.
+
+    Distinct lowercased names are kept sorted so exact and prefix lookups are a bisect; a trigram ->
+    name-id index answers fuzzy queries by scoring only names that can share enough trigrams with the query.
+    """
+
+    PREFIX_SCAN = 1024
+    FUZZY_OVERLAP = 0.5
+
+    def __init__(
+        self,
+        root: pathlib.Path,
+        records: dict[str, dict[str, Any]],
+        max_files: int = 0,
+        stamps: dict[str, tuple[int, int]] | None = None,
+        mtimes: dict[str, int] | None = None,
+    ) -> None:
+        self.root = root
+        self.built = time.time()
+        self.checked = time.monotonic()
+        self.files = len(records)
+        self.max_files = max_files
+        self.stamps = stamps or {}
+        self.mtimes = mtimes or {}
+        by_name: dict[str, list[tuple[str, str, str, int, str]]] = {}
+        for rel, record in records.items():
+            for name, kind, line, signature in record["definitions"]:
+                by_name.setdefault(name.lower(), []).append((name, kind, rel, line, signature))
+        self.names = sorted(by_name)
+        self.locations = [by_name[name] for name in self.names]
+        self.count = sum(len(entries) for entries in self.locations)
+        self.grams: dict[str, array.array] = {}
+        self.sizes = array.array("B")
+        self._sizes: Any = None
+        for name_id, name in enumerate(self.names):
+            grams = _trigrams(name)
+            self.sizes.append(min(len(grams), 255))
+            for gram in grams:
+                postings = self.grams.get(gram)
+                if postings is None:
+                    postings = self.grams[gram] = array.array("I")
+                postings.append(name_id)
+
+    def _fuzzy(self, needle: str, seen: set[int]) -> Iterator[tuple[float, int]]:
+        """(dice score, name id) for names sharing at least FUZZY_OVERLAP of the query's trigrams, best first."""
+        grams = _trigrams(needle)
+        need = max(1, math.ceil(len(grams) * self.FUZZY_OVERLAP))
+        lists = [self.grams[gram] for gram in grams if gram in self.grams]
+        if len(lists) < need:
+            return
+        np = _numpy()
+        if np is not None:
+            if self._sizes is None:
+                self._sizes = np.frombuffer(self.sizes, dtype=np.uint8).astype(np.float64)
+            counts = np.bincount(
+                np.concatenate([np.frombuffer(postings, dtype=np.uint32) for postings in lists]),
+                minlength=len(self.names),
+            )
+            ids = np.flatnonzero(counts >= need)
+            scores = 2 * counts[ids] / (len(grams) + self._sizes[ids])
+            # Ids follow name order, so a stable sort breaks score ties alphabetically.
+            order = np.argsort(-scores, kind="stable")
+            ranked: Iterable[tuple[float, int]] = zip(scores[order].tolist(), ids[order].tolist())
+        else:
+            shared: Counter[int] = Counter()
+            for postings in lists:
+                shared.update(postings)
+            ranked = sorted(
+                (
+                    (2 * count / (len(grams) + self.sizes[name_id]), name_id)
+                    for name_id, count in shared.items()
+                    if count >= need
+                ),
+                key=lambda item: (-item[0], item[1]),
+            )
+        for score, name_id in ranked:
+            if name_id not in seen:
+                yield score, name_id
+
+    def find(self, query: str, kind: str = "", limit: int = 20) -> list[dict[str, Any]]:
+        """Exact matches, then prefix matches (shortest first), then fuzzy matches by trigram similarity."""
+        needle = query.strip().lower()
+        if not needle:
+            return []
+        start = bisect.bisect_left(self.names, needle)
+        prefixed = []
+        for name_id in range(start, min(len(self.names), start + self.PREFIX_SCAN)):
+            if not self.names[name_id].startswith(needle):
+                break
+            prefixed.append(name_id)
+        prefixed.sort(key=lambda name_id: len(self.names[name_id]))
+        results: list[dict[str, Any]] = []
+
+        def emit(name_id: int, match: str, score: float) -> bool:
+            for name, symbol_kind, rel, line, signature in self.locations[name_id]:
+                if kind and symbol_kind != kind:
+                    continue
+                results.append(
+                    {
+                        "name": name,
+                        "kind": symbol_kind,
+                        "file": rel,
+                        "line": line,
+                        "signature": signature,
+                        "match": match,
+                        "score": round(score, 4),
+                    }
+                )
+                if len(results) >= limit:
+                    return True
+            return False
+
+        for name_id in prefixed:
+            name = self.names[name_id]
+            if emit(name_id, "exact" if name == needle else "prefix", len(needle) / len(name)):
+                return results
+        for score, name_id in self._fuzzy(needle, set(prefixed)):
+            if emit(name_id, "fuzzy", score):
+                break
+        return results
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "root": str(self.root),
+            "files": self.files,
+            "symbols": self.count,
+            "names": len(self.names),
+            "trigrams": len(self.grams),
+            "age_seconds": round(time.time() - self.built, 1),
+        }
+
+
+_SYMBOL_TABLES: OrderedDict[str, _SymbolTable] = OrderedDict()
+
+
+def _build_symbol_table(root: pathlib.Path, max_files: int) -> _SymbolTable:
+    directories: list[str] = []
+    records: dict[str, dict[str, Any]] = {}
+    stamps: dict[str, tuple[int, int]] = {}
+    for path in _iter_files(root, max_files, suffixes=_LSMCP_SUFFIXES, directories=directories):
+        rel = str(path.relative_to(root)).replace("\\", "/")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stamps[rel] = (stat.st_mtime_ns, stat.st_size)
+        records[rel] = _SYMBOLS.record(path)
+    _SYMBOLS.flush()
+    table = _SymbolTable(root, records, max_files, stamps, _walk_mtimes(directories))
+    _SYMBOL_TABLES[str(root)] = table
+    _SYMBOL_TABLES.move_to_end(str(root))
+    while len(_SYMBOL_TABLES) > _SYMBOL_TABLE_LIMIT:
+        _SYMBOL_TABLES.popitem(last=False)
+    return table
+
+
+def register_lsmcp(mcp: FastMCP) -> None:
+    @mcp.tool()
+    def lsmcp_symbols(root_path: str = ROOT_DEFAULT, max_files: int = 600) -> dict[str, Any]:
+        root = _to_safe_root(root_path)
+        results = []
+        walk: dict[str, int] = {}
+        for path in _iter_files(root, max_files, suffixes=_LSMCP_SUFFIXES, stats=walk):
+            symbols = _SYMBOLS.record(path)["symbols"]
+            if not symbols:
+                continue
+            results.append(
+                {
+                    "file": str(path.relative_to(root)).replace("\\", "/"),
+                    "symbols": symbols[:50],
+                }
+            )
+        _SYMBOLS.flush()
+        return {
+            "root": str(root),
+            "count": len(results),
+            "pruned_dirs": walk["pruned_dirs"],
+            **_CURSORS.open("lsmcp_symbols", "files", results, 300),
+        }
+
+    @mcp.tool()
+    def lsmcp_symbols_next(cursor: str) -> dict[str, Any]:
+        return _CURSORS.next_page("lsmcp_symbols", cursor)
+
+    @mcp.tool()
+    def lsmcp_find_symbol(
+        query: str,
+        kind: str = "",
+        limit: int = 20,
+        root_path: str = ROOT_DEFAULT,
+        max_files: int = 20000,
+        refresh: bool = False,
+    ) -> dict[str, Any]:
+        started = time.perf_counter()
+        root = _to_safe_root(root_path)
+        limit = max(1, min(limit, 200))
+        table = None if refresh else _SYMBOL_TABLES.get(str(root))
+        if table is not None and table.max_files != max_files:
+            table = None
+        now = time.monotonic()
+        if table is not None and now - table.checked >= _SYMBOL_RECHECK_SECONDS:
+            # Directory mtimes catch added, removed and renamed files; stamps catch edits in place.
+            if _mtimes_unchanged(table.mtimes) and _stamps_unchanged(str(root), table.stamps):
+                table.checked = now
+            else:
+                table = None
+        rebuilt = table is None
+        if table is None:
+            table = _build_symbol_table(root, max_files)
+        results = table.find(query, kind.strip().lower(), limit)
+        # Hits are re-checked on every query so a moved or deleted definition is never returned.
+        if not rebuilt and any(_SYMBOLS.stale(root / result["file"]) for result in results):
+            table = _build_symbol_table(root, max_files)
+            rebuilt = True
+            results = table.find(query, kind.strip().lower(), limit)
+        elapsed = time.perf_counter() - started
+        return {
+            "ok": True,
+            "root": str(root),
+            "query": query,
+            "results": results,
+            "count": len(results),
+            "rebuilt": rebuilt,
+            "lookup_ms": round(elapsed * 1000, 3),
+            "table": table.stats(),
+        }
+
+
+def _resolve_import(importer: str, module: str, names: list[str], files: dict[str, int]) -> list[str]:
+    """Map one import of a root-relative file to the indexed files it loads; [] for external modules."""
+    directory = posixpath.dirname(importer)
+    if importer.endswith(".py"):
+        dots = len(module) - len(module.lstrip("."))
+        parts = [part for part in module[dots:].split(".") if part]
+        if dots:
+            base = directory
+            for _ in range(dots - 1):
+                base = posixpath.dirname(base)
+            bases = [base]
+        else:
+            # Any ancestor of the importer may be a source root (repo root, src/, a nested project).
+            bases = [""]
+            for part in directory.split("/") if directory else []:
+                bases.append(posixpath.join(bases[-1], part))
+
+        def module_file(base: str, parts: list[str]) -> str | None:
+            path = posixpath.join(base, *parts) if parts else base
+            # A package shadows a module of the same name, as in the import system.
+            for candidate in (posixpath.join(path, "__init__.py"), path + ".py") if parts else (
+                posixpath.join(path, "__init__.py"),
+            ):
+                if candidate in files:
+                    return candidate
+            return None
+
+        for base in bases:
+            target = module_file(base, parts)
+            submodules = [module_file(base, [*parts, name]) for name in names]
+            resolved = [submodule for submodule in submodules if submodule]
+            if target and len(resolved) < len(names):
+                resolved.append(target)
+            if target or resolved:
+                return resolved or [target]  # type: ignore[list-item]
+        return []
+    if module.startswith("."):
+        bases = [posixpath.normpath(posixpath.join(directory, module))]
+    elif module.startswith(("@/", "~/")):
+        # The conventional "@/" alias points at the src/ directory of the enclosing project.
+        bases = []
+        ancestor = directory
+        while True:
+            bases.append(posixpath.join(ancestor, "src", module[2:]))
+            if not ancestor:
+                break
+            ancestor = posixpath.dirname(ancestor)
+    else:
+        return []
+    for base in bases:
+        stem, extension = posixpath.splitext(base)
+        candidates = [base, *(base + suffix for suffix in _JS_SUFFIXES)]
+        if extension in {".js", ".jsx", ".mjs", ".cjs"}:
+            # TypeScript sources are imported with the extension they compile to.
+            candidates.extend(stem + suffix for suffix in _JS_SUFFIXES)
+        candidates.extend(posixpath.join(base, "index" + suffix) for suffix in _JS_SUFFIXES)
+        for candidate in candidates:
+            if candidate in files:
+                return [candidate]
+    return []
+
+
+def _csr(count: int, edges: list[tuple[int, int]]) -> tuple[array.array[int], array.array[int]]:
+    """Compressed sparse row adjacency: targets of node n are index[pointer[n]:pointer[n + 1]]."""
+    pointer = array.array("I", bytes(4 * (count + 1)))
+    for source, _target in edges:
+        pointer[source + 1] += 1
+    for node in range(count):
+        pointer[node + 1] += pointer[node]
+    fill = array.array("I", pointer)
+    index = array.array("I", bytes(4 * len(edges)))
+    for source, target in edges:
+        index[fill[source]] = target
+        fill[source] += 1
+    return pointer, index
+
+
+def _strongly_connected(count: int, pointer: array.array[int], index: array.array[int]) -> list[list[int]]:
+    """Iterative Tarjan; components come out in reverse topological order."""
+    order = [-1] * count
+    low = [0] * count
+    on_stack = [False] * count
+    stack: list[int] = []
+    components: list[list[int]] = []
+    counter = 0
+    for start in range(count):
+        if order[start] >= 0:
+            continue
+        order[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack[start] = True
+        work = [(start, pointer[start])]
+        while work:
+            node, edge = work[-1]
+            if edge < pointer[node + 1]:
+                work[-1] = (node, edge + 1)
+                target = index[edge]
+                if order[target] < 0:
+                    order[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = True
+                    work.append((target, pointer[target]))
+                elif on_stack[target]:
+                    low[node] = min(low[node], order[target])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == order[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+class _ImportGraph:
+    """File-level import graph with forward/reverse CSR adjacency and precomputed SCCs."""
+
+    def __init__(
+        self,
+        root: str,
+        files: list[str],
+        edges: set[tuple[int, int]],
+        external: dict[int, list[str]],
+        max_files: int = 0,
+        stamps: dict[str, tuple[int, int]] | None = None,
+        mtimes: dict[str, int] | None = None,
+    ) -> None:
+        self.root = root
+        self.files = files
+        self.max_files = max_files
+        self.stamps = stamps or {}
+        self.mtimes = mtimes or {}
+        self.ids = {name: node for node, name in enumerate(files)}
+        self.external = external
+        self.built_at = time.time()
+        ordered = sorted(edges)
+        self.edge_count = len(ordered)
+        self.forward = _csr(len(files), ordered)
+        self.reverse = _csr(len(files), [(target, source) for source, target in ordered])
+        self.component = array.array("I", bytes(4 * len(files)))
+        self.cycles: list[list[int]] = []
+        for number, members in enumerate(_strongly_connected(len(files), *self.forward)):
+            for member in members:
+                self.component[member] = number
+            if len(members) > 1:
+                self.cycles.append(sorted(members))
+        self.cycles.sort(key=len, reverse=True)
+
+    def fresh(self, max_files: int) -> bool:
+        """Whether the same walk would see the same files with the same (mtime_ns, size) stamps."""
+        return (
+            max_files == self.max_files
+            and _mtimes_unchanged(self.mtimes)
+            and _stamps_unchanged(self.root, self.stamps)
+        )
+
+    def neighbours(self, node: int, reverse: bool = False) -> array.array[int]:
+        pointer, index = self.reverse if reverse else self.forward
+        return index[pointer[node] : pointer[node + 1]]
+
+    def reach(self, node: int, depth: int, reverse: bool = False) -> list[tuple[int, int]]:
+        """Breadth-first (node, distance) pairs within depth hops, excluding the start node."""
+        seen = {node}
+        frontier = [node]
+        found: list[tuple[int, int]] = []
+        for distance in range(1, depth + 1):
+            following = []
+            for current in frontier:
+                for target in self.neighbours(current, reverse):
+                    if target not in seen:
+                        seen.add(target)
+                        following.append(target)
+                        found.append((target, distance))
+            if not following:
+                break
+            frontier = following
+        return found
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "root": self.root,
+            "files": len(self.files),
+            "edges": self.edge_count,
+            "cycles": len(self.cycles),
+            "age_seconds": round(time.time() - self.built_at, 1),
+        }
+
+
+_IMPORT_GRAPHS: OrderedDict[str, _ImportGraph] = OrderedDict()
+_IMPORT_GRAPH_LIMIT = 8
+
+
+def _build_import_graph(
+    root: pathlib.Path, max_files: int, visit: Callable[[str, dict[str, Any]], None] | None = None
+) -> tuple[_ImportGraph, dict[str, int]]:
+    """Walk root once through the symbol cache, resolve imports and remember the graph for later queries."""
+    walk: dict[str, int] = {}
+    directories: list[str] = []
+    records: list[tuple[str, dict[str, Any]]] = []
+    stamps: dict[str, tuple[int, int]] = {}
+    for path in _iter_files(root, max_files, stats=walk, directories=directories):
+        rel = str(path.relative_to(root)).replace("\\", "/")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        # Stamp before extracting, so an edit racing the build makes the graph look stale rather than fresh.
+        stamps[rel] = (stat.st_mtime_ns, stat.st_size)
+        record = _SYMBOLS.record(path)
+        records.append((rel, record))
+        if visit is not None:
+            visit(rel, record)
+    _SYMBOLS.flush()
+    files = sorted(rel for rel, _record in records)
+    ids = {name: node for node, name in enumerate(files)}
+    edges: set[tuple[int, int]] = set()
+    external: dict[int, list[str]] = {}
+    for rel, record in records:
+        source = ids[rel]
+        for module, names in record["specifiers"]:
+            targets = _resolve_import(rel, module, names, ids)
+            if not targets:
+                external.setdefault(source, []).append(module)
+            edges.update((source, ids[target]) for target in targets if target != rel)
+    graph = _ImportGraph(str(root), files, edges, external, max_files, stamps, _walk_mtimes(directories))
+    _IMPORT_GRAPHS[str(root)] = graph
+    _IMPORT_GRAPHS.move_to_end(str(root))
+    while len(_IMPORT_GRAPHS) > _IMPORT_GRAPH_LIMIT:
+        _IMPORT_GRAPHS.popitem(last=False)
+    return graph, walk
+
+
+def _import_graph(root: pathlib.Path, max_files: int) -> _ImportGraph:
+    """The remembered graph of root if nothing it was built from changed, else a fresh build."""
+    graph = _IMPORT_GRAPHS.get(str(root))
+    if graph is not None and graph.fresh(max_files):
+        _IMPORT_GRAPHS.move_to_end(str(root))
+        return graph
+    return _build_import_graph(root, max_files)[0]
+
+
+def register_codegraph(mcp: FastMCP) -> None:
+    def _lookup(root_path: str, file_path: str, max_files: int) -> tuple[_ImportGraph, int] | dict[str, Any]:
+        root = _to_safe_root(root_path)
+        graph = _import_graph(root, max_files)
+        target = (root / file_path).resolve()
+        rel = str(target.relative_to(root)).replace("\\", "/") if root in target.parents else file_path
+        node = graph.ids.get(rel)
+        if node is None:
+            return {
+                "ok": False,
+                "error": f"{file_path} is not in the import graph of {root} (first {max_files} files).",
+            }
+        return graph, node
+
+    @mcp.tool()
+    def codegraph_index(root_path: str = ROOT_DEFAULT, max_files: int = 900) -> dict[str, Any]:
+        root = _to_safe_root(root_path)
+        files = []
+        edges = []
+
+        def visit(rel: str, record: dict[str, Any]) -> None:
+            functions = record["functions"]
+            classes = record["classes"]
+            if functions or classes:
+                files.append({"file": rel, "functions": functions[:30], "classes": classes[:30]})
+
+        graph, walk = _build_import_graph(root, max_files, visit)
+        for node, name in enumerate(graph.files):
+            edges.extend({"from": name, "to": graph.files[target], "resolved": True} for target in graph.neighbours(node))
+            edges.extend({"from": name, "to": module, "resolved": False} for module in graph.external.get(node, []))
+        return {
+            "root": str(root),
+            "node_count": len(files),
+            "edge_count": len(edges),
+            "resolved_edge_count": graph.edge_count,
+            "cycle_count": len(graph.cycles),
+            "pruned_dirs": walk["pruned_dirs"],
+            **_CURSORS.open("codegraph_index", "nodes", files, 400),
+            **_CURSORS.open("codegraph_index", "edges", edges, 600, cursor_key="edges_cursor"),
+        }
+
+    @mcp.tool()
+    def codegraph_index_next(cursor: str) -> dict[str, Any]:
+        return _CURSORS.next_page("codegraph_index", cursor)
+
+    @mcp.tool()
+    def codegraph_dependents(
+        file_path: str, root_path: str = ROOT_DEFAULT, depth: int = 1, max_results: int = 200, max_files: int = 900
+    ) -> dict[str, Any]:
+        found = _lookup(root_path, file_path, max_files)
+        if isinstance(found, dict):
+            return found
+        graph, node = found
+        reached = graph.reach(node, max(1, min(depth, 10)), reverse=True)
+        limit = max(1, min(max_results, 2000))
+        return {
+            "ok": True,
+            "file": graph.files[node],
+            "dependents": [{"file": graph.files[other], "depth": distance} for other, distance in reached[:limit]],
+            "count": len(reached),
+            "truncated": len(reached) > limit,
+        }
+
+    @mcp.tool()
+    def codegraph_dependencies(
+        file_path: str, root_path: str = ROOT_DEFAULT, depth: int = 1, max_results: int = 200, max_files: int = 900
+    ) -> dict[str, Any]:
+        found = _lookup(root_path, file_path, max_files)
+        if isinstance(found, dict):
+            return found
+        graph, node = found
+        reached = graph.reach(node, max(1, min(depth, 10)))
+        limit = max(1, min(max_results, 2000))
+        return {
+            "ok": True,
+            "file": graph.files[node],
+            "dependencies": [{"file": graph.files[other], "depth": distance} for other, distance in reached[:limit]],
+            "external": sorted(set(graph.external.get(node, []))),
+            "count": len(reached),
+            "truncated": len(reached) > limit,
+        }
+
+    @mcp.tool()
+    def codegraph_cycles(root_path: str = ROOT_DEFAULT, max_results: int = 50, max_files: int = 900) -> dict[str, Any]:
+        graph = _import_graph(_to_safe_root(root_path), max_files)
+        cycles = graph.cycles[: max(1, min(max_results, 500))]
+        return {
+            "ok": True,
+            "root": graph.root,
+            "cycle_count": len(graph.cycles),
+            "cycles": [{"size": len(members), "files": [graph.files[member] for member in members]} for members in cycles],
+        }
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _chunk_spans(
+    content: str, lines_per_chunk: int, overlap: int, max_chars: int
+) -> Iterator[tuple[int, int, int, int]]:
+    """Yield (start, end, first line, last line) for overlapping line windows of at most max_chars."""
+    index = _LineIndex(content)
+    total = index.line_count()
+    first = 1
+    while first <= total:
+        last = min(total, first + lines_per_chunk - 1)
+        start = index.offset(first)
+        while last > first and index.offset(last + 1) - start > max_chars:
+            last -= 1
+        end = index.offset(last + 1)
+        # A single line longer than the budget (minified bundles, data URIs) is split by characters.
+        for window in range(start, max(end, start + 1), max_chars):
+            yield window, min(end, window + max_chars), first, last
+        if last >= total:
+            break
+        first = max(first + 1, last + 1 - overlap)
+
+
+def _encode_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+_SKIP_INTERVAL = 64
+
+
+def _encode_postings(
+    chunk_ids: Iterable[int], frequencies: Iterable[int], positions: Iterable[int]
+) -> tuple[bytes, bytes, bytes]:
+    """Pack ascending postings into (data, positions, skips) blobs.
+
+    data holds varint(chunk id delta), varint(frequency) pairs; positions holds each posting's token
+    positions as varint deltas; skips holds (first id, previous id, data offset, positions offset) as
+    uint32 for every _SKIP_INTERVAL-th posting so cursors can jump whole blocks.
+    """
+    data = bytearray()
+    packed = bytearray()
+    skips = array.array("I")
+    source = iter(positions)
+    previous = 0
+    for ordinal, (chunk_id, frequency) in enumerate(zip(chunk_ids, frequencies)):
+        if ordinal and ordinal % _SKIP_INTERVAL == 0:
+            skips.extend((chunk_id, previous, len(data), len(packed)))
+        _encode_varint(chunk_id - previous, data)
+        _encode_varint(frequency, data)
+        last = 0
+        for _ in range(frequency):
+            position = next(source)
+            _encode_varint(position - last, packed)
+            last = position
+        previous = chunk_id
+    return bytes(data), bytes(packed), skips.tobytes()
+
+
+def _decode_postings(data: bytes) -> Iterator[tuple[int, int]]:
+    chunk_id = 0
+    value = shift = 0
+    delta = -1
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        if delta < 0:
+            delta = value
+        else:
+            chunk_id += delta
+            yield chunk_id, value
+            delta = -1
+        value = shift = 0
+
+
+_EXHAUSTED = 1 << 62
+
+
+class _PostingCursor:
+    """Forward-only cursor over one term's segments that skips tombstoned chunks.
+
+    advance() passes over segments whose last id is below the target and uses skip entries to jump
+    blocks; positions are only decoded for postings that a positional operator asks about.
+    """
+
+    positional = True
+
+    def __init__(self, segments: list[tuple[int, bytes, bytes, bytes]], lengths: array.array[int], df: int) -> None:
+        self._segments = segments
+        self._lengths = lengths
+        self.cost = df
+        self.doc = -1
+        self.frequency = 0
+        self._segment = -1
+        self._data = b""
+        self._positions = b""
+        self._skip_ids: array.array[int] = array.array("I")
+        self._skips: array.array[int] = array.array("I")
+        self._offset = 0
+        self._previous = 0
+        self._pos_offset = 0
+        self._pending_positions = 0
+        self._decoded: tuple[int, list[int]] = (-1, [])
+
+    def _open(self, segment: int) -> bool:
+        self._segment = segment
+        if segment >= len(self._segments):
+            self.doc = _EXHAUSTED
+            return False
+        _last_id, self._data, self._positions, skips = self._segments[segment]
+        self._skips = array.array("I", skips)
+        self._skip_ids = self._skips[0::4]
+        self._offset = self._previous = self._pos_offset = self._pending_positions = 0
+        self.frequency = 0
+        return True
+
+    def _step(self) -> bool:
+        while self._offset >= len(self._data):
+            if not self._open(self._segment + 1):
+                return False
+        self._pending_positions += self.frequency
+        delta, self._offset = _read_varint(self._data, self._offset)
+        self.frequency, self._offset = _read_varint(self._data, self._offset)
+        self._previous += delta
+        self.doc = self._previous
+        return True
+
+    def advance(self, target: int) -> int:
+        while self.doc < target:
+            if self._segment < 0 or self._segments[self._segment][0] < target:
+                # Every posting left in this segment is below the target.
+                while self._segment + 1 < len(self._segments) and self._segments[self._segment + 1][0] < target:
+                    self._segment += 1
+                if not self._open(self._segment + 1):
+                    return self.doc
+            block = bisect.bisect_right(self._skip_ids, target) - 1
+            if block >= 0 and self._skips[block * 4 + 2] > self._offset:
+                _first, self._previous, self._offset, self._pos_offset = self._skips[block * 4 : block * 4 + 4]
+                self._pending_positions = self.frequency = 0
+            while self._step() and self.doc < target:
+                pass
+            if self.doc == _EXHAUSTED:
+                return self.doc
+            if self.doc < len(self._lengths) and self._lengths[self.doc]:
+                continue
+            # Tombstoned chunk: keep walking from the next id.
+            target = max(target, self.doc + 1)
+        return self.doc
+
+    def positions(self) -> list[int]:
+        if self._decoded[0] == self.doc:
+            return self._decoded[1]
+        offset = self._pos_offset
+        for _ in range(self._pending_positions):
+            _value, offset = _read_varint(self._positions, offset)
+        result = []
+        position = 0
+        for _ in range(self.frequency):
+            delta, offset = _read_varint(self._positions, offset)
+            position += delta
+            result.append(position)
+        self._pos_offset = offset
+        self._pending_positions = -self.frequency
+        self._decoded = (self.doc, result)
+        return result
+
+    def spans(self) -> list[tuple[int, int]]:
+        return [(position, position) for position in self.positions()]
+
+
+class _Conjunction:
+    """Leapfrog intersection ordered by cost, with exclusions and an optional positional check."""
+
+    positional = False
+
+    def __init__(self, children: list[Any], excluded: list[Any]) -> None:
+        self.children = sorted(children, key=lambda child: child.cost)
+        self.excluded = excluded
+        self.cost = self.children[0].cost
+        self.doc = -1
+
+    def accept(self) -> bool:
+        return True
+
+    def advance(self, target: int) -> int:
+        if self.doc >= target:
+            return self.doc
+        doc = target
+        while doc < _EXHAUSTED:
+            # The cheapest child leads, so the work follows the rarest operand.
+            doc = self.children[0].advance(doc)
+            if doc >= _EXHAUSTED:
+                break
+            for child in self.children[1:]:
+                found = child.advance(doc)
+                if found != doc:
+                    doc = found
+                    break
+            else:
+                if all(other.advance(doc) != doc for other in self.excluded) and self.accept():
+                    self.doc = doc
+                    return doc
+                doc += 1
+        self.doc = _EXHAUSTED
+        return self.doc
+
+
+class _Phrase(_Conjunction):
+    positional = True
+
+    def __init__(self, terms: list[_PostingCursor]) -> None:
+        super().__init__(terms, [])
+        self.terms = terms
+        self._spans: list[tuple[int, int]] = []
+
+    def accept(self) -> bool:
+        starts = set(self.terms[0].positions())
+        for offset, term in enumerate(self.terms[1:], 1):
+            starts &= {position - offset for position in term.positions()}
+            if not starts:
+                return False
+        self._spans = [(start, start + len(self.terms) - 1) for start in sorted(starts)]
+        return True
+
+    def spans(self) -> list[tuple[int, int]]:
+        return self._spans
+
+
+class _Near(_Conjunction):
+    positional = True
+
+    def __init__(self, left: Any, right: Any, distance: int) -> None:
+        super().__init__([left, right], [])
+        self.left = left
+        self.right = right
+        self.distance = distance
+        self._spans: list[tuple[int, int]] = []
+
+    def accept(self) -> bool:
+        right = self.right.spans()
+        spans = []
+        for start, end in self.left.spans():
+            for other_start, other_end in right:
+                if other_start > end + self.distance:
+                    break
+                if max(other_start - end, start - other_end) <= self.distance:
+                    spans.append((min(start, other_start), max(end, other_end)))
+        self._spans = sorted(set(spans))
+        return bool(self._spans)
+
+    def spans(self) -> list[tuple[int, int]]:
+        return self._spans
+
+
+class _Disjunction:
+    def __init__(self, children: list[Any]) -> None:
+        self.children = children
+        self.cost = sum(child.cost for child in children)
+        self.positional = all(child.positional for child in children)
+        self.doc = -1
+
+    def advance(self, target: int) -> int:
+        if self.doc < target:
+            self.doc = min(child.advance(target) if child.doc < target else child.doc for child in self.children)
+        return self.doc
+
+    def spans(self) -> list[tuple[int, int]]:
+        return sorted(span for child in self.children if child.doc == self.doc for span in child.spans())
+
+
+_RAG_OPERATOR_RE = re.compile(r'"|\(|\)|\b(?:AND|OR|NOT|NEAR(?:/\d+)?)\b')
+_RAG_QUERY_TOKEN_RE = re.compile(r'"[^"]*"?|\(|\)|[^\s()"]+')
+_RAG_NEAR_RE = re.compile(r"NEAR(?:/(\d+))?")
+_RAG_NEAR_DEFAULT = 10
+
+
+def _parse_rag_query(query: str) -> tuple[Any, ...]:
+    """Parse phrase/NEAR/AND/OR/NOT syntax into a tuple tree.
+
+    Nodes: ("term", t), ("phrase", [t, ...]), ("near", left, right, k), ("and", [include], [exclude]),
+    ("or", [children]). Adjacent operands without an operator are ANDed; NEAR binds tightest, then AND, then OR.
+    """
+    tokens = _RAG_QUERY_TOKEN_RE.findall(query)
+    cursor = 0
+
+    def peek() -> str | None:
+        return tokens[cursor] if cursor < len(tokens) else None
+
+    def take() -> str:
+        nonlocal cursor
+        cursor += 1
+        return tokens[cursor - 1]
+
+    def parse_or() -> tuple[Any, ...]:
+        children = [parse_and()]
+        while peek() == "OR":
+            take()
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and() -> tuple[Any, ...]:
+        include: list[tuple[Any, ...]] = []
+        exclude: list[tuple[Any, ...]] = []
+        while peek() not in {None, ")", "OR"}:
+            if peek() == "AND":
+                take()
+                continue
+            negate = peek() == "NOT"
+            if negate:
+                take()
+            (exclude if negate else include).append(parse_near())
+        if not include:
+            raise ValueError("Each AND/OR group needs at least one term that is not negated with NOT.")
+        return include[0] if len(include) == 1 and not exclude else ("and", include, exclude)
+
+    def parse_near() -> tuple[Any, ...]:
+        node = parse_primary()
+        while peek() is not None and _RAG_NEAR_RE.fullmatch(peek() or ""):
+            match = _RAG_NEAR_RE.fullmatch(take())
+            distance = int(match.group(1)) if match and match.group(1) else _RAG_NEAR_DEFAULT
+            right = parse_primary()
+            if not (_positional(node) and _positional(right)):
+                raise ValueError("NEAR operands must be terms, phrases, NEAR groups or OR groups of those.")
+            node = ("near", node, right, distance)
+        return node
+
+    def parse_primary() -> tuple[Any, ...]:
+        token = peek()
+        if token is None:
+            raise ValueError("Query ended where a term was expected.")
+        if token == "(":
+            take()
+            node = parse_or()
+            if peek() != ")":
+                raise ValueError("Missing closing parenthesis.")
+            take()
+            return node
+        if token in {")", "AND", "OR", "NOT"} or _RAG_NEAR_RE.fullmatch(token):
+            raise ValueError(f"Unexpected {token!r} where a term was expected.")
+        take()
+        words = _tokenize(token.strip('"'))
+        if not words:
+            raise ValueError(f"{token!r} contains no searchable words.")
+        return ("term", words[0]) if len(words) == 1 else ("phrase", words)
+
+    if not tokens:
+        raise ValueError("Empty query.")
+    tree = parse_or()
+    if peek() is not None:
+        raise ValueError(f"Unexpected {peek()!r}.")
+    return tree
+
+
+def _positional(node: tuple[Any, ...]) -> bool:
+    if node[0] == "or":
+        return all(_positional(child) for child in node[1])
+    return node[0] in {"term", "phrase", "near"}
+
+
+def _query_terms(node: tuple[Any, ...]) -> list[str]:
+    """Terms that can contribute to a match (everything outside NOT)."""
+    kind = node[0]
+    if kind == "term":
+        return [node[1]]
+    if kind == "phrase":
+        return list(node[1])
+    if kind == "near":
+        return _query_terms(node[1]) + _query_terms(node[2])
+    children = node[1]
+    return [term for child in children for term in _query_terms(child)]
+
+
+@lru_cache(maxsize=1)
+def _numpy() -> Any:
+    """numpy if installed; the TF-IDF matrix falls back to pure Python without it."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _hashed_features(tokens: list[str], ngram: int, bits: int) -> dict[int, int]:
+    """Count word 1..ngram-grams hashed into 2**bits buckets."""
+    mask = (1 << bits) - 1
+    counts: dict[int, int] = {}
+    for order in range(1, ngram + 1):
+        for index in range(len(tokens) - order + 1):
+            feature = zlib.crc32(" ".join(tokens[index : index + order]).encode("utf-8")) & mask
+            counts[feature] = counts.get(feature, 0) + 1
+    return counts
+
+
+class _TfidfMatrix:
+    """Sparse chunk x hashed-feature TF-IDF matrix held in both row (CSR) and column (CSC) order.
+
+    Rows are L2-normalised with sublinear tf and smoothed idf, so a dot product is a cosine similarity.
+    Scoring walks only the columns of the query's features; numpy vectorises it when installed.
+    """
+
+    def __init__(
+        self,
+        chunk_ids: array.array[int],
+        indptr: array.array[int],
+        features: array.array[int],
+        counts: array.array[int],
+        bits: int,
+        file_rows: dict[str, tuple[int, int]],
+    ) -> None:
+        self.chunk_ids = chunk_ids
+        self.file_rows = file_rows
+        self.nnz = len(features)
+        self.rows = len(chunk_ids)
+        self.buckets = 1 << bits
+        np = _numpy()
+        if np is not None:
+            self._build_numpy(np, indptr, features, counts)
+        else:
+            self._build_python(indptr, features, counts)
+
+    def _build_numpy(self, np: Any, indptr: array.array[int], features: array.array[int], counts: array.array[int]) -> None:
+        row_ptr = np.frombuffer(indptr, dtype=np.uint32).astype(np.int64)
+        columns = np.frombuffer(features, dtype=np.uint32).astype(np.int64)
+        row_of = np.repeat(np.arange(self.rows, dtype=np.int64), np.diff(row_ptr))
+        df = np.bincount(columns, minlength=self.buckets)
+        idf = np.log((self.rows + 1) / (df + 1)) + 1
+        weights = (1 + np.log(np.frombuffer(counts, dtype=np.uint32).astype(np.float64))) * idf[columns]
+        norms = np.sqrt(np.bincount(row_of, weights=weights * weights, minlength=self.rows))
+        weights = (weights / np.maximum(norms[row_of], 1e-12)).astype(np.float32)
+        order = np.argsort(columns, kind="stable")
+        self._np = np
+        self.idf = idf
+        self.row_ptr, self.columns, self.weights = row_ptr, columns, weights
+        self.col_ptr = np.concatenate(([0], np.cumsum(df)))
+        self.col_rows, self.col_weights = row_of[order], weights[order]
+
+    def _build_python(self, indptr: array.array[int], features: array.array[int], counts: array.array[int]) -> None:
+        df = array.array("I", bytes(4 * self.buckets))
+        for feature in features:
+            df[feature] += 1
+        idf = array.array("d", (math.log((self.rows + 1) / (count + 1)) + 1 for count in df))
+        weights = array.array("d", bytes(8 * len(features)))
+        for row in range(self.rows):
+            start, end = indptr[row], indptr[row + 1]
+            total = 0.0
+            for index in range(start, end):
+                weight = (1 + math.log(counts[index])) * idf[features[index]]
+                weights[index] = weight
+                total += weight * weight
+            norm = math.sqrt(total) or 1.0
+            for index in range(start, end):
+                weights[index] /= norm
+        col_ptr = array.array("I", bytes(4 * (self.buckets + 1)))
+        running = 0
+        for feature, count in enumerate(df):
+            col_ptr[feature] = running
+            running += count
+        col_ptr[self.buckets] = running
+        fill = array.array("I", col_ptr)
+        col_rows = array.array("I", bytes(4 * len(features)))
+        col_weights = array.array("d", bytes(8 * len(features)))
+        for row in range(self.rows):
+            for index in range(indptr[row], indptr[row + 1]):
+                slot = fill[features[index]]
+                col_rows[slot] = row
+                col_weights[slot] = weights[index]
+                fill[features[index]] = slot + 1
+        self._np = None
+        self.idf = idf
+        self.row_ptr, self.columns, self.weights = indptr, features, weights
+        self.col_ptr, self.col_rows, self.col_weights = col_ptr, col_rows, col_weights
+
+    def query_vector(self, counts: dict[int, int]) -> dict[int, float]:
+        vector = {feature: (1 + math.log(count)) * float(self.idf[feature]) for feature, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {feature: weight / norm for feature, weight in vector.items()}
+
+    def row_vector(self, rows: Iterable[int]) -> dict[int, float]:
+        """Normalised centroid of the given rows."""
+        vector: dict[int, float] = {}
+        for row in rows:
+            for index in range(int(self.row_ptr[row]), int(self.row_ptr[row + 1])):
+                feature = int(self.columns[index])
+                vector[feature] = vector.get(feature, 0.0) + float(self.weights[index])
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {feature: weight / norm for feature, weight in vector.items()}
+
+    def top(
+        self, vector: dict[int, float], limit: int, exclude: set[int] | None = None, prune_common: bool = False
+    ) -> list[tuple[int, float]]:
+        """Return (chunk id, cosine) for the best rows, skipping excluded chunk ids.
+
+        With prune_common, features present in more than half of the rows are skipped when the vector has
+        anything more selective (the usual max_df cut-off): they barely move the ranking but dominate the work.
+        """
+        exclude = exclude or set()
+        if not self.rows:
+            return []
+        np = self._np
+        if np is not None:
+            spans = [(int(self.col_ptr[feature]), int(self.col_ptr[feature + 1]), weight) for feature, weight in vector.items()]
+            spans = [span for span in spans if span[1] > span[0]]
+            if not spans:
+                return []
+            if prune_common:
+                spans = [span for span in spans if span[1] - span[0] <= self.rows // 2] or spans
+            rows = np.concatenate([self.col_rows[start:end] for start, end, _weight in spans])
+            weights = np.concatenate([self.col_weights[start:end] * weight for start, end, weight in spans])
+            scores = np.bincount(rows, weights=weights, minlength=self.rows)
+            keep = min(self.rows, limit + len(exclude))
+            best = np.argpartition(-scores, keep - 1)[:keep]
+            ranked = [(int(self.chunk_ids[row]), float(scores[row])) for row in best]
+        else:
+            accumulated: dict[int, float] = {}
+            if prune_common:
+                vector = {
+                    feature: weight
+                    for feature, weight in vector.items()
+                    if self.col_ptr[feature + 1] - self.col_ptr[feature] <= self.rows // 2
+                } or vector
+            for feature, weight in vector.items():
+                for index in range(self.col_ptr[feature], self.col_ptr[feature + 1]):
+                    row = self.col_rows[index]
+                    accumulated[row] = accumulated.get(row, 0.0) + self.col_weights[index] * weight
+            ranked = [(self.chunk_ids[row], score) for row, score in accumulated.items()]
+        ranked = [item for item in ranked if item[0] not in exclude and item[1] > 0]
+        return heapq.nlargest(limit, ranked, key=lambda item: item[1])
+
+
+class _RagIndex:
+    """Chunk-level BM25 index persisted in SQLite; only postings of the query terms are read per search.
+
+    Terms are interned to integer ids and each indexing pass appends one segment of varint-packed,
+    delta-encoded postings (with token positions and skip entries) per term. Removed chunks are tombstoned (their postings stay until the next
+    merge), and segments are merged once tombstones pass a quarter of the live chunks. The database is
+    opened lazily and memory-mapped, so a restarted adapter can answer queries without a rebuild.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    VERSION = 4
+    TABLES = ("files", "chunks", "terms", "postings")
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS files (key TEXT PRIMARY KEY, path TEXT, mtime_ns INTEGER, size INTEGER)",
+        "CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY AUTOINCREMENT, file_key TEXT, start INTEGER,"
+        " end INTEGER, first_line INTEGER, last_line INTEGER, length INTEGER)",
+        "CREATE INDEX IF NOT EXISTS chunks_by_file ON chunks (file_key)",
+        "CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT UNIQUE, df INTEGER)",
+        "CREATE TABLE IF NOT EXISTS postings (term_id INTEGER, segment INTEGER, count INTEGER, last_id INTEGER,"
+        " data BLOB, positions BLOB, skips BLOB, PRIMARY KEY (term_id, segment)) WITHOUT ROWID",
+    )
+
+    def __init__(
+        self,
+        db_path: pathlib.Path | None,
+        lines_per_chunk: int,
+        overlap: int,
+        max_chars: int,
+        flush_postings: int,
+        ngram: int,
+        feature_bits: int,
+    ) -> None:
+        self.lines_per_chunk = max(1, lines_per_chunk)
+        self.overlap = max(0, min(overlap, self.lines_per_chunk - 1))
+        self.max_chars = max(256, max_chars)
+        self.flush_postings = max(10_000, flush_postings)
+        self.ngram = max(1, min(ngram, 3))
+        self.feature_bits = max(12, min(feature_bits, 24))
+        self._db_path = db_path
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+        # Build buffers for the current pass: term -> (chunk ids, frequencies, positions), ascending by chunk id.
+        self._pending: dict[str, tuple[array.array[int], array.array[int], array.array[int]]] = {}
+        self._pending_count = 0
+        # Chunk lengths indexed by chunk id (0 = removed), loaded on first search.
+        self._lengths: array.array[int] | None = None
+        self._live = 0
+        self._total_length = 0
+        # Built on first semantic use and dropped whenever chunks change.
+        self._matrix: _TfidfMatrix | None = None
+        self._matrix_stale = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is not None:
+            return self._db
+        db: sqlite3.Connection | None = None
+        if self._db_path is not None:
+            try:
+                self._db_path.parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(str(self._db_path), check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(f"PRAGMA mmap_size={_env_int('MCP_ADAPTER_RAG_MMAP_MB', 256) * 1024 * 1024}")
+            except (OSError, sqlite3.Error):
+                db = None
+        if db is None:
+            db = sqlite3.connect(":memory:", check_same_thread=False)
+        db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+        layout = {
+            "version": self.VERSION,
+            "lines_per_chunk": self.lines_per_chunk,
+            "overlap": self.overlap,
+            "max_chars": self.max_chars,
+        }
+        stored = dict(db.execute("SELECT name, value FROM meta").fetchall())
+        # Chunk boundaries depend on the layout settings; a different layout or format invalidates the store.
+        if any(stored.get(name) != value for name, value in layout.items()):
+            for table in self.TABLES:
+                db.execute(f"DROP TABLE IF EXISTS {table}")
+            db.execute("DELETE FROM meta")
+            db.executemany("INSERT INTO meta (name, value) VALUES (?, ?)", layout.items())
+        for statement in self.SCHEMA:
+            db.execute(statement)
+        db.commit()
+        self._db = db
+        return db
+
+    def _meta(self, db: sqlite3.Connection, name: str) -> int:
+        row = db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump(self, db: sqlite3.Connection, name: str, delta: int) -> None:
+        db.execute(
+            "INSERT INTO meta (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, delta),
+        )
+
+    def _chunk_lengths(self, db: sqlite3.Connection) -> array.array[int]:
+        if self._lengths is None:
+            top = db.execute("SELECT MAX(id) FROM chunks").fetchone()[0] or 0
+            lengths = array.array("I", bytes(4 * (top + 1)))
+            live = total = 0
+            for chunk_id, length in db.execute("SELECT id, length FROM chunks"):
+                lengths[chunk_id] = length
+                live += 1
+                total += length
+            self._lengths, self._live, self._total_length = lengths, live, total
+        return self._lengths
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            db = self._connect()
+            postings = self._meta(db, "postings")
+            doc_bytes = self._meta(db, "doc_bytes")
+            position_bytes = self._meta(db, "position_bytes")
+            skip_bytes = self._meta(db, "skip_bytes")
+            # Every blob a posting needs counts: doc deltas, term positions and the skip table.
+            posting_bytes = doc_bytes + position_bytes + skip_bytes
+            return {
+                "files": db.execute("SELECT COUNT(*) FROM files").fetchone()[0],
+                "chunks": db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0],
+                "terms": db.execute("SELECT COUNT(*) FROM terms").fetchone()[0],
+                "postings": postings,
+                "posting_bytes": posting_bytes,
+                "doc_bytes": doc_bytes,
+                "position_bytes": position_bytes,
+                "skip_bytes": skip_bytes,
+                "bytes_per_posting": round(posting_bytes / postings, 3) if postings else 0.0,
+                "tombstoned_chunks": self._meta(db, "dead_chunks"),
+                "semantic": (
+                    {
+                        "rows": self._matrix.rows,
+                        "nnz": self._matrix.nnz,
+                        "stale_files_skipped": self._matrix_stale,
+                        "numpy": _numpy() is not None,
+                    }
+                    if self._matrix is not None
+                    else None
+                ),
+                "lines_per_chunk": self.lines_per_chunk,
+                "overlap": self.overlap,
+                "store": str(self._db_path) if self._db_path else None,
+            }
+
+    def stamps(self, prefix: str) -> dict[str, tuple[int, int]]:
+        """Return {key: (mtime_ns, size)} for indexed files under a workspace-relative directory."""
+        with self._lock:
+            rows = self._connect().execute("SELECT key, mtime_ns, size FROM files").fetchall()
+        if prefix in {"", "."}:
+            return {key: (mtime_ns, size) for key, mtime_ns, size in rows}
+        return {key: (mtime_ns, size) for key, mtime_ns, size in rows if key.startswith(prefix + "/")}
+
+    def _remove(self, db: sqlite3.Connection, key: str) -> None:
+        rows = db.execute("SELECT id, length FROM chunks WHERE file_key = ?", (key,)).fetchall()
+        if rows:
+            self._matrix = None
+            db.execute("DELETE FROM chunks WHERE file_key = ?", (key,))
+            self._bump(db, "dead_chunks", len(rows))
+            if self._lengths is not None:
+                for chunk_id, length in rows:
+                    if chunk_id < len(self._lengths) and self._lengths[chunk_id]:
+                        self._lengths[chunk_id] = 0
+                        self._live -= 1
+                        self._total_length -= length
+        db.execute("DELETE FROM files WHERE key = ?", (key,))
+
+    def remove(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            db = self._connect()
+            for key in keys:
+                self._remove(db, key)
+
+    def add(self, key: str, path: pathlib.Path, stat: os.stat_result, content: str) -> int:
+        with self._lock:
+            db = self._connect()
+            self._remove(db, key)
+            self._matrix = None
+            chunks = 0
+            for start, end, first, last in _chunk_spans(content, self.lines_per_chunk, self.overlap, self.max_chars):
+                positions: dict[str, list[int]] = {}
+                for position, token in enumerate(_tokenize(content[start:end])):
+                    positions.setdefault(token, []).append(position)
+                if not positions:
+                    continue
+                length = sum(len(offsets) for offsets in positions.values())
+                chunk_id = db.execute(
+                    "INSERT INTO chunks (file_key, start, end, first_line, last_line, length) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, start, end, first, last, length),
+                ).lastrowid
+                for term, offsets in positions.items():
+                    buffers = self._pending.get(term)
+                    if buffers is None:
+                        buffers = self._pending[term] = (array.array("I"), array.array("I"), array.array("I"))
+                    buffers[0].append(chunk_id)
+                    buffers[1].append(len(offsets))
+                    buffers[2].extend(offsets)
+                self._pending_count += len(positions) + length
+                if self._lengths is not None:
+                    if chunk_id >= len(self._lengths):
+                        self._lengths.extend(bytes(4 * (chunk_id + 1 - len(self._lengths))))
+                    self._lengths[chunk_id] = length
+                    self._live += 1
+                    self._total_length += length
+                chunks += 1
+            db.execute(
+                "INSERT INTO files (key, path, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                (key, str(path), stat.st_mtime_ns, stat.st_size),
             )
-        target.write_text(content, encoding="utf-8")
-        return {"ok": True, "file": str(target)}
+            if self._pending_count >= self.flush_postings:
+                self._flush(db)
+            return chunks
 
-    @mcp.tool()
-    def react_update_component(file_path: str, content: str) -> dict[str, Any]:
-        target = _to_safe_root(file_path)
-        if not target.exists():
-            return {"ok": False, "error": f"{target} does not exist"}
-        target.write_text(content, encoding="utf-8")
-        return {"ok": True, "file": str(target), "bytes": len(content.encode("utf-8"))}
+    def _flush(self, db: sqlite3.Connection) -> None:
+        """Write buffered postings as a new segment, interning unseen terms."""
+        if not self._pending:
+            return
+        segment = self._meta(db, "segments") + 1
+        terms = sorted(self._pending)
+        db.executemany("INSERT OR IGNORE INTO terms (term, df) VALUES (?, 0)", ((term,) for term in terms))
+        term_ids: dict[str, int] = {}
+        for batch in _batched(terms, 500):
+            term_ids.update(
+                db.execute(f"SELECT term, id FROM terms WHERE term IN ({','.join('?' * len(batch))})", batch)
+            )
+        rows = []
+        postings = doc_bytes = position_bytes = skip_bytes = 0
+        for term in terms:
+            chunk_ids, frequencies, positions = self._pending[term]
+            data, packed, skips = _encode_postings(chunk_ids, frequencies, positions)
+            rows.append((term_ids[term], segment, len(chunk_ids), chunk_ids[-1], data, packed, skips))
+            postings += len(chunk_ids)
+            doc_bytes += len(data)
+            position_bytes += len(packed)
+            skip_bytes += len(skips)
+        db.executemany(
+            "INSERT INTO postings (term_id, segment, count, last_id, data, positions, skips) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        db.executemany("UPDATE terms SET df = df + ? WHERE id = ?", ((row[2], row[0]) for row in rows))
+        self._bump(db, "segments", 1)
+        self._bump(db, "postings", postings)
+        self._bump(db, "doc_bytes", doc_bytes)
+        self._bump(db, "position_bytes", position_bytes)
+        self._bump(db, "skip_bytes", skip_bytes)
+        self._pending.clear()
+        self._pending_count = 0
 
+    def commit(self) -> None:
+        with self._lock:
+            db = self._connect()
+            self._flush(db)
+            live = db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            if self._meta(db, "dead_chunks") * 4 > live:
+                self._merge(db)
+            db.commit()
 
-def register_vue(mcp: FastMCP) -> None:
-    @mcp.tool()
-    def vue_list_components(root_path: str = ROOT_DEFAULT, max_files: int = 1000) -> dict[str, Any]:
-        root = _to_safe_root(root_path)
-        components: list[str] = []
-        for path in _iter_files(root, max_files):
-            if path.suffix.lower() != ".vue":
+    def _merge(self, db: sqlite3.Connection) -> None:
+        """Rewrite each term's segments as one segment without tombstoned chunks, one term at a time."""
+        lengths = self._chunk_lengths(db)
+        segment = self._meta(db, "segments")
+        postings = doc_bytes = position_bytes = skip_bytes = 0
+        term_ids = [row[0] for row in db.execute("SELECT id FROM terms").fetchall()]
+        for term_id in term_ids:
+            chunk_ids = array.array("I")
+            frequencies = array.array("I")
+            positions = array.array("I")
+            cursor = _PostingCursor(self._segments(db, term_id), lengths, 0)
+            while cursor.advance(cursor.doc + 1) < _EXHAUSTED:
+                chunk_ids.append(cursor.doc)
+                frequencies.append(cursor.frequency)
+                positions.extend(cursor.positions())
+            db.execute("DELETE FROM postings WHERE term_id = ?", (term_id,))
+            if not chunk_ids:
+                db.execute("DELETE FROM terms WHERE id = ?", (term_id,))
                 continue
-            components.append(str(path.relative_to(root)).replace("\\", "/"))
-        return {"root": str(root), "components": components[:400], "count": len(components)}
-
-    @mcp.tool()
-    def vue_create_component(component_name: str, directory: str = f"{ROOT_DEFAULT}/src/components") -> dict[str, Any]:
-        safe_dir = _to_safe_root(directory)
-        safe_dir.mkdir(parents=True, exist_ok=True)
-        target = safe_dir / f"{component_name}.vue"
-        if target.exists():
-            return {"ok": False, "error": f"{target} already exists"}
-        content = (
-            "<template>\n"
-            "  <div class=\"component-root\">TODO: implement</div>\n"
-            "</template>\n\n"
-            "<script setup lang=\"ts\">\n"
-            "</script>\n\n"
-            "<style scoped>\n"
-            ".component-root {\n"
-            "}\n"
-            "</style>\n"
+            data, packed, skips = _encode_postings(chunk_ids, frequencies, positions)
+            db.execute(
+                "INSERT INTO postings (term_id, segment, count, last_id, data, positions, skips)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (term_id, segment, len(chunk_ids), chunk_ids[-1], data, packed, skips),
+            )
+            db.execute("UPDATE terms SET df = ? WHERE id = ?", (len(chunk_ids), term_id))
+            postings += len(chunk_ids)
+            doc_bytes += len(data)
+            position_bytes += len(packed)
+            skip_bytes += len(skips)
+        db.executemany(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+            (
+                ("postings", postings),
+                ("doc_bytes", doc_bytes),
+                ("position_bytes", position_bytes),
+                ("skip_bytes", skip_bytes),
+                ("dead_chunks", 0),
+            ),
         )
-        target.write_text(content, encoding="utf-8")
-        return {"ok": True, "file": str(target)}
 
+    def _segments(self, db: sqlite3.Connection, term_id: int) -> list[tuple[int, bytes, bytes, bytes]]:
+        return db.execute(
+            "SELECT last_id, data, positions, skips FROM postings WHERE term_id = ? ORDER BY segment", (term_id,)
+        ).fetchall()
 
-def register_shadcn(mcp: FastMCP) -> None:
-    presets = {
-        "button": "export function Button() { return <button className=\"px-4 py-2 rounded-md border\">Button</button>; }",
-        "card": "export function Card({ children }) { return <div className=\"rounded-xl border p-4 shadow-sm\">{children}</div>; }",
-        "badge": "export function Badge({ children }) { return <span className=\"rounded-full border px-2 py-0.5 text-xs\">{children}</span>; }",
-    }
+    def _cursor(self, db: sqlite3.Connection, term: str) -> _PostingCursor:
+        row = db.execute("SELECT id, df FROM terms WHERE term = ?", (term,)).fetchone()
+        if row is None:
+            return _PostingCursor([], self._chunk_lengths(db), 0)
+        return _PostingCursor(self._segments(db, row[0]), self._chunk_lengths(db), row[1])
 
-    @mcp.tool()
-    def shadcn_list_components() -> dict[str, Any]:
-        return {"components": sorted(presets.keys())}
+    def _plan(self, db: sqlite3.Connection, node: tuple[Any, ...]) -> Any:
+        kind = node[0]
+        if kind == "term":
+            return self._cursor(db, node[1])
+        if kind == "phrase":
+            return _Phrase([self._cursor(db, term) for term in node[1]])
+        if kind == "near":
+            return _Near(self._plan(db, node[1]), self._plan(db, node[2]), node[3])
+        if kind == "or":
+            return _Disjunction([self._plan(db, child) for child in node[1]])
+        return _Conjunction([self._plan(db, child) for child in node[1]], [self._plan(db, child) for child in node[2]])
 
-    @mcp.tool()
-    def shadcn_get_component(name: str) -> dict[str, Any]:
-        key = name.strip().lower()
-        if key not in presets:
-            return {"ok": False, "error": f"Unknown component '{name}'", "available": sorted(presets.keys())}
-        return {"ok": True, "name": key, "tsx": presets[key]}
+    def search(self, query: str, limit: int) -> list[dict[str, Any]]:
+        """Rank chunks by BM25; queries using quotes, parentheses, AND/OR/NOT or NEAR/k are matched first."""
+        structured = _RAG_OPERATOR_RE.search(query) is not None
+        tree = _parse_rag_query(query) if structured else None
+        terms = list(dict.fromkeys(_query_terms(tree) if tree else _tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            db = self._connect()
+            lengths = self._chunk_lengths(db)
+            if not self._live:
+                return []
+            average_length = self._total_length / self._live or 1.0
+            # Like Lucene, tombstoned chunks keep counting towards N and df until the next merge.
+            chunk_count = self._live + self._meta(db, "dead_chunks")
 
+            def weight(df: int, frequency: int, length: int) -> float:
+                df = min(df, chunk_count)
+                idf = math.log(1 + (chunk_count - df + 0.5) / (df + 0.5))
+                norm = self.K1 * (1 - self.B + self.B * length / average_length)
+                return idf * frequency * (self.K1 + 1) / (frequency + norm)
 
-def register_lsmcp(mcp: FastMCP) -> None:
-    symbol_re = re.compile(
-        r"^\s*(?:export\s+)?(?:async\s+)?(?:function|class|const|let|var|interface|type)\s+([A-Za-z_][A-Za-z0-9_]*)",
-        re.MULTILINE,
-    )
+            scores: dict[int, float] = {}
+            if tree is not None:
+                # Matching is driven by the rarest operands; matched chunks are then scored from separate cursors.
+                root = self._plan(db, tree)
+                scorers = [self._cursor(db, term) for term in terms]
+                doc = root.advance(0)
+                while doc < _EXHAUSTED:
+                    score = 0.0
+                    for scorer in scorers:
+                        if scorer.advance(doc) == doc:
+                            score += weight(scorer.cost, scorer.frequency, lengths[doc])
+                    scores[doc] = score
+                    doc = root.advance(doc + 1)
+            else:
+                for term in terms:
+                    row = db.execute("SELECT id, df FROM terms WHERE term = ?", (term,)).fetchone()
+                    if row is None:
+                        continue
+                    # Segments are decoded as a stream; no per-term list of postings is built.
+                    for (data,) in db.execute(
+                        "SELECT data FROM postings WHERE term_id = ? ORDER BY segment", (row[0],)
+                    ):
+                        for chunk_id, frequency in _decode_postings(data):
+                            length = lengths[chunk_id] if chunk_id < len(lengths) else 0
+                            if length:
+                                scores[chunk_id] = scores.get(chunk_id, 0.0) + weight(row[1], frequency, length)
+            return self._render(db, heapq.nlargest(limit * 3, scores.items(), key=lambda item: item[1]), terms, limit)
 
-    @mcp.tool()
-    def lsmcp_symbols(root_path: str = ROOT_DEFAULT, max_files: int = 600) -> dict[str, Any]:
-        root = _to_safe_root(root_path)
-        results = []
-        for path in _iter_files(root, max_files):
-            if path.suffix.lower() not in {".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs"}:
+    def _render(
+        self,
+        db: sqlite3.Connection,
+        ranked: Iterable[tuple[int, float]],
+        terms: list[str],
+        limit: int,
+        one_per_file: bool = False,
+    ) -> list[dict[str, Any]]:
+        results: list[dict[str, Any]] = []
+        taken: dict[str, list[tuple[int, int]]] = {}
+        # Overlapping windows of one file usually share the same hit; keep the best-scoring one.
+        for chunk_id, score in ranked:
+            row = db.execute(
+                "SELECT c.file_key, c.start, c.end, c.first_line, c.last_line, f.path, f.mtime_ns, f.size"
+                " FROM chunks c JOIN files f ON f.key = c.file_key WHERE c.id = ?",
+                (chunk_id,),
+            ).fetchone()
+            if row is None:
                 continue
-            content = _read_text(path)
-            symbols = symbol_re.findall(content)
-            if not symbols:
+            spans = taken.setdefault(row[0], [])
+            if (one_per_file and spans) or any(
+                row[3] <= other_last and other_first <= row[4] for other_first, other_last in spans
+            ):
                 continue
-            results.append(
-                {
-                    "file": str(path.relative_to(root)).replace("\\", "/"),
-                    "symbols": symbols[:50],
-                }
-            )
-        return {"root": str(root), "files": results[:300], "count": len(results)}
+            spans.append((row[3], row[4]))
+            results.append(self._result(row, score, terms))
+            if len(results) >= limit:
+                break
+        return results
 
+    def _tfidf(self, db: sqlite3.Connection) -> _TfidfMatrix:
+        if self._matrix is None:
+            chunk_ids = array.array("I")
+            indptr = array.array("I", [0])
+            features = array.array("I")
+            counts = array.array("I")
+            file_rows: dict[str, tuple[int, int]] = {}
+            self._matrix_stale = 0
+            current, text = "", None
+            for chunk_id, key, path, mtime_ns, size, start, end in db.execute(
+                "SELECT c.id, c.file_key, f.path, f.mtime_ns, f.size, c.start, c.end FROM chunks c"
+                " JOIN files f ON f.key = c.file_key ORDER BY c.file_key, c.id"
+            ):
+                if key != current:
+                    current, text = key, None
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        stat = None
+                    # Chunk offsets only fit the text that was indexed; edited files wait for ragdocs_index.
+                    if stat is not None and (stat.st_mtime_ns, stat.st_size) == (mtime_ns, size):
+                        text = _read_text(pathlib.Path(path))
+                    else:
+                        self._matrix_stale += 1
+                if text is None:
+                    continue
+                row = _hashed_features(_tokenize(text[start:end]), self.ngram, self.feature_bits)
+                if not row:
+                    continue
+                first, _end = file_rows.get(key, (len(chunk_ids), 0))
+                file_rows[key] = (first, len(chunk_ids) + 1)
+                chunk_ids.append(chunk_id)
+                features.extend(row.keys())
+                counts.extend(row.values())
+                indptr.append(len(features))
+            self._matrix = _TfidfMatrix(chunk_ids, indptr, features, counts, self.feature_bits, file_rows)
+        return self._matrix
 
-def register_codegraph(mcp: FastMCP) -> None:
-    function_re = re.compile(r"^\s*(?:def|function|export\s+function)\s+([A-Za-z_][A-Za-z0-9_]*)", re.MULTILINE)
-    class_re = re.compile(r"^\s*(?:class|export\s+class)\s+([A-Za-z_][A-Za-z0-9_]*)", re.MULTILINE)
-    import_re = re.compile(r"^\s*(?:from\s+([A-Za-z0-9_./-]+)\s+import|import\s+([A-Za-z0-9_.,\s/-]+))", re.MULTILINE)
+    def prepare_semantic(self) -> int:
+        with self._lock:
+            return self._tfidf(self._connect()).rows
 
-    @mcp.tool()
-    def codegraph_index(root_path: str = ROOT_DEFAULT, max_files: int = 900) -> dict[str, Any]:
-        root = _to_safe_root(root_path)
-        files = []
-        edges = []
-        for path in _iter_files(root, max_files):
-            content = _read_text(path)
-            rel = str(path.relative_to(root)).replace("\\", "/")
-            functions = function_re.findall(content)
-            classes = class_re.findall(content)
-            if functions or classes:
-                files.append({"file": rel, "functions": functions[:30], "classes": classes[:30]})
-            for match in import_re.finditer(content):
-                target = (match.group(1) or match.group(2) or "").split(",")[0].strip()
-                if target:
-                    edges.append({"from": rel, "to": target})
-        return {"root": str(root), "node_count": len(files), "edge_count": len(edges), "nodes": files[:400], "edges": edges[:600]}
+    def semantic(self, query: str, limit: int) -> list[dict[str, Any]]:
+        """Rank chunks by TF-IDF cosine similarity to the query."""
+        tokens = _tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            db = self._connect()
+            matrix = self._tfidf(db)
+            vector = matrix.query_vector(_hashed_features(tokens, self.ngram, self.feature_bits))
+            return self._render(db, matrix.top(vector, limit * 3, prune_common=True), list(dict.fromkeys(tokens)), limit)
+
+    def similar(self, key: str, limit: int) -> list[dict[str, Any]] | None:
+        """Files whose chunks are closest to the centroid of an indexed file; None if it is not indexed."""
+        with self._lock:
+            db = self._connect()
+            matrix = self._tfidf(db)
+            rows = matrix.file_rows.get(key)
+            if rows is None:
+                return None
+            own = {matrix.chunk_ids[row] for row in range(*rows)}
+            ranked = matrix.top(matrix.row_vector(range(*rows)), limit * 8, exclude=own)
+            return self._render(db, ranked, [], limit, one_per_file=True)
+
+    @staticmethod
+    def _result(row: tuple[Any, ...], score: float, terms: list[str]) -> dict[str, Any]:
+        key, start, end, first, last, path, mtime_ns, size = row
+        result: dict[str, Any] = {"file": key, "score": round(score, 4), "line_start": first, "line_end": last}
+        try:
+            stat = os.stat(path)
+            if stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                result["stale"] = True
+        except OSError:
+            result["stale"] = True
+        text = _read_text(pathlib.Path(path))[start:end]
+        lower = text.lower()
+        hits = [index for index in (lower.find(term) for term in terms) if index >= 0]
+        index = min(hits) if hits else 0
+        result["snippet"] = text[max(0, index - 120) : index + 220]
+        return result
+
+
+def _batched(items: list[Any], size: int) -> Iterator[list[Any]]:
+    for index in range(0, len(items), size):
+        yield items[index : index + size]
+
+
+def _build_rag_index() -> _RagIndex:
+    cache_dir = _cache_dir()
+    return _RagIndex(
+        cache_dir / "ragdocs.sqlite3" if cache_dir else None,
+        _env_int("MCP_ADAPTER_RAG_CHUNK_LINES", 40),
+        _env_int("MCP_ADAPTER_RAG_CHUNK_OVERLAP", 8),
+        _env_int("MCP_ADAPTER_RAG_CHUNK_CHARS", 4000),
+        _env_int("MCP_ADAPTER_RAG_FLUSH_POSTINGS", 1_000_000),
+        _env_int("MCP_ADAPTER_RAG_NGRAM", 1),
+        _env_int("MCP_ADAPTER_RAG_FEATURE_BITS", 20),
+    )
+
+
+_RAG_INDEX = _build_rag_index()
 
 
 def register_ragdocs(mcp: FastMCP) -> None:
     @mcp.tool()
-    def ragdocs_index(root_path: str = ROOT_DEFAULT, max_files: int = 600) -> dict[str, Any]:
+    def ragdocs_index(root_path: str = ROOT_DEFAULT, max_files: int = 600, semantic: bool = False) -> dict[str, Any]:
         root = _to_safe_root(root_path)
+        workspace = pathlib.Path(ROOT_DEFAULT).resolve()
+        prefix = str(root.relative_to(workspace)).replace("\\", "/")
+        known = _RAG_INDEX.stamps(prefix)
+        seen: set[str] = set()
         indexed = 0
-        for path in _iter_files(root, max_files):
-            content = _read_text(path)
-            if not content.strip():
+        unchanged = 0
+        chunks = 0
+        walk: dict[str, int] = {}
+        for path in _iter_files(root, max_files, stats=walk):
+            key = str(path.relative_to(workspace)).replace("\\", "/")
+            seen.add(key)
+            try:
+                stat = path.stat()
+            except OSError:
                 continue
-            key = str(path.relative_to(root)).replace("\\", "/")
-            _RAG_INDEX[key] = content[:12000]
-            indexed += 1
-        return {"root": str(root), "indexed_count": indexed, "total_indexed": len(_RAG_INDEX)}
+            if known.get(key) == (stat.st_mtime_ns, stat.st_size):
+                unchanged += 1
+                continue
+            # Blank files are still recorded so the next refresh can skip them by stamp.
+            added = _RAG_INDEX.add(key, path, stat, _read_text(path))
+            chunks += added
+            indexed += 1 if added else 0
+        # A walk cut short by max_files has not seen every file, so absence only proves deletion on a full walk.
+        removed = [key for key in known if key not in seen] if len(seen) < max_files else []
+        _RAG_INDEX.remove(removed)
+        _RAG_INDEX.commit()
+        result = {
+            "root": str(root),
+            "indexed_count": indexed,
+            "unchanged_count": unchanged,
+            "removed_count": len(removed),
+            "chunk_count": chunks,
+            "total_indexed": len(_RAG_INDEX),
+            "pruned_dirs": walk["pruned_dirs"],
+        }
+        if semantic:
+            result["semantic_rows"] = _RAG_INDEX.prepare_semantic()
+        return result
 
     @mcp.tool()
-    def ragdocs_search(query: str, max_results: int = 10) -> dict[str, Any]:
-        if not _RAG_INDEX:
+    def ragdocs_search(query: str, max_results: int = 10, mode: str = "lexical") -> dict[str, Any]:
+        if mode not in {"lexical", "semantic"}:
+            return {"ok": False, "error": "mode must be 'lexical' or 'semantic'."}
+        if not len(_RAG_INDEX):
             return {"ok": False, "error": "No indexed documents. Run ragdocs_index first."}
-        key = query.lower()
-        scored: list[tuple[int, str, str]] = []
-        for path, content in _RAG_INDEX.items():
-            lower = content.lower()
-            score = lower.count(key)
-            if score <= 0:
-                continue
-            idx = lower.find(key)
-            snippet = content[max(0, idx - 120): idx + 220]
-            scored.append((score, path, snippet))
-        scored.sort(reverse=True)
-        payload = [
-            {"file": path, "score": score, "snippet": snippet}
-            for score, path, snippet in scored[: max(1, min(max_results, 30))]
-        ]
-        return {"ok": True, "query": query, "results": payload, "count": len(payload)}
+        limit = max(1, min(max_results, 30))
+        if mode == "semantic":
+            payload = _RAG_INDEX.semantic(query, limit)
+        else:
+            try:
+                payload = _RAG_INDEX.search(query, limit)
+            except ValueError as exc:
+                return {"ok": False, "error": f"Invalid query: {exc}"}
+        return {"ok": True, "query": query, "mode": mode, "results": payload, "count": len(payload)}
+
+    @mcp.tool()
+    def ragdocs_similar(file_path: str, max_results: int = 10) -> dict[str, Any]:
+        workspace = pathlib.Path(ROOT_DEFAULT).resolve()
+        target = (workspace / file_path).resolve()
+        if workspace not in target.parents:
+            return {"ok": False, "error": "file_path must be inside the workspace."}
+        key = str(target.relative_to(workspace)).replace("\\", "/")
+        payload = _RAG_INDEX.similar(key, max(1, min(max_results, 30)))
+        if payload is None:
+            return {
+                "ok": False,
+                "error": f"{key} is not indexed or changed since it was. Run ragdocs_index on its directory first.",
+            }
+        return {"ok": True, "file": key, "results": payload, "count": len(payload)}
 
 
 def register_semgrep(mcp: FastMCP) -> None:
-    suspicious = {
-        "eval": re.compile(r"\beval\s*\("),
-        "exec": re.compile(r"\bexec\s*\("),
-        "hardcoded_password": re.compile(r"(?i)\b(password|passwd|pwd)\b\s*[:=]\s*['\"].+['\"]"),
-        "http_no_tls": re.compile(r"(?i)http://[A-Za-z0-9._/-]+"),
-    }
+    suspicious: _RuleSpec = (
+        ("eval", r"\beval\s*\(", ("eval",)),
+        ("exec", r"\bexec\s*\(", ("exec",)),
+        ("hardcoded_password", r"(?i)\b(password|passwd|pwd)\b\s*[:=]\s*['\"].+['\"]", ("passw", "pwd")),
+        ("http_no_tls", r"(?i)http://[A-Za-z0-9._/-]+", ("http://",)),
+    )
 
     @mcp.tool()
-    def semgrep_scan_local(root_path: str = ROOT_DEFAULT, max_files: int = 1000) -> dict[str, Any]:
+    def semgrep_scan_local(root_path: str = ROOT_DEFAULT, max_files: int = 1000, context_lines: int = 0) -> dict[str, Any]:
         root = _to_safe_root(root_path)
-        findings = []
-        for path in _iter_files(root, max_files):
-            content = _read_text(path)
-            rel = str(path.relative_to(root)).replace("\\", "/")
-            for rule_name, regex in suspicious.items():
-                for match in regex.finditer(content):
-                    findings.append(
-                        {
-                            "rule": rule_name,
-                            "file": rel,
-                            "line": _line_number(content, match.start()),
-                            "snippet": match.group(0)[:120],
-                        }
-                    )
-                    if len(findings) >= 500:
-                        break
-                if len(findings) >= 500:
-                    break
-            if len(findings) >= 500:
-                break
-        return {"root": str(root), "finding_count": len(findings), "findings": findings[:150]}
+        walk: dict[str, int] = {}
+        paths = _iter_files(root, max_files, stats=walk)
+        jobs = _rule_jobs(suspicious, root, paths, 500, max(0, min(context_lines, 10)))
+        findings = _run_scan(_scan_file_rules, jobs, 500)
+        return {
+            "root": str(root),
+            "finding_count": len(findings),
+            "pruned_dirs": walk["pruned_dirs"],
+            **_CURSORS.open("semgrep_scan_local", "findings", findings, 150),
+        }
+
+    @mcp.tool()
+    def semgrep_scan_local_next(cursor: str) -> dict[str, Any]:
+        return _CURSORS.next_page("semgrep_scan_local", cursor)
 
     @mcp.tool()
     def semgrep_rule_schema() -> dict[str, Any]:
-        return {"rules": list(suspicious.keys())}
+        return {"rules": [name for name, _pattern, _literals in suspicious]}
 
 
-def register_repomapper(mcp: FastMCP) -> None:
-    function_re = re.compile(r"^\s*(?:def|function|export\s+function)\s+([A-Za-z_][A-Za-z0-9_]*)", re.MULTILINE)
-    class_re = re.compile(r"^\s*(?:class|export\s+class)\s+([A-Za-z_][A-Za-z0-9_]*)", re.MULTILINE)
+class _RepoMap:
+    """Definition -> reference graph between the files of one root, ranked with personalised PageRank.
+
+    A file that uses a name defined elsewhere gets an edge to each defining file. Only files whose
+    symbol record changed, plus files referencing names whose definitions moved, have their edges
+    rebuilt; rankings are cached per (graph version, focus) and warm-started from the last vector.
+    """
+
+    DAMPING = 0.85
+    TOLERANCE = 1e-6
+    MAX_ITERATIONS = 100
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.records: dict[str, dict[str, Any]] = {}
+        self.definers: dict[str, set[str]] = {}
+        self.referrers: dict[str, set[str]] = {}
+        # Per referencing file: (defining file, name, weight) links and their total weight.
+        self.links: dict[str, list[tuple[str, str, float]]] = {}
+        self.totals: dict[str, float] = {}
+        self.version = 0
+        self._edges: tuple[int, list[int], list[int], list[float]] | None = None
+        self._cache: OrderedDict[tuple[int, tuple[str, ...]], tuple[list[tuple[float, str, list[Any]]], int]] = (
+            OrderedDict()
+        )
+        self._last_ranks: dict[str, float] = {}
+
+    def _weight(self, name: str, count: int, definers: int) -> float:
+        """Weight of the link from one referencing file to each of the files defining name."""
+        weight = math.sqrt(count) / definers
+        if definers > 5:
+            weight *= 0.1  # Generic names (run, get, main) defined all over the tree say little.
+        if name.startswith("_"):
+            weight *= 0.1
+        return weight
+
+    def update(self, records: dict[str, dict[str, Any]]) -> int:
+        """Apply the current records of every file; returns how many files changed."""
+        changed = [rel for rel, record in records.items() if self.records.get(rel) is not record]
+        changed.extend(rel for rel in self.records if rel not in records)
+        if not changed:
+            return 0
+        dirty_names: set[str] = set()
+        for rel in changed:
+            for record, add in ((self.records.get(rel), False), (records.get(rel), True)):
+                if record is None:
+                    continue
+                for definition in record["definitions"]:
+                    holders = self.definers.setdefault(definition[0], set())
+                    if add:
+                        holders.add(rel)
+                    else:
+                        holders.discard(rel)
+                    dirty_names.add(definition[0])
+                for name in record["references"]:
+                    holders = self.referrers.setdefault(name, set())
+                    if add:
+                        holders.add(rel)
+                    else:
+                        holders.discard(rel)
+        dirty_files = set(changed)
+        for name in dirty_names:
+            dirty_files.update(self.referrers.get(name, ()))
+        self.records = dict(records)
+        for rel in dirty_files:
+            record = self.records.get(rel)
+            if record is None:
+                self.links.pop(rel, None)
+                self.totals.pop(rel, None)
+                continue
+            links = []
+            for name, count in record["references"].items():
+                holders = self.definers.get(name)
+                if not holders:
+                    continue
+                weight = self._weight(name, count, len(holders))
+                links.extend((holder, name, weight) for holder in holders if holder != rel)
+            self.links[rel] = links
+            self.totals[rel] = sum(link[2] for link in links)
+        self.version += 1
+        self._edges = None
+        self._cache.clear()
+        return len(changed)
+
+    def _pagerank(self, files: list[str], focus: tuple[str, ...]) -> tuple[list[float], int]:
+        ids = {rel: node for node, rel in enumerate(files)}
+        count = len(files)
+        if self._edges is None or self._edges[0] != self.version:
+            sources: list[int] = []
+            targets: list[int] = []
+            weights: list[float] = []
+            for rel, links in self.links.items():
+                total = self.totals[rel]
+                if not total:
+                    continue
+                merged: dict[str, float] = {}
+                for holder, _name, weight in links:
+                    merged[holder] = merged.get(holder, 0.0) + weight
+                for holder, weight in merged.items():
+                    sources.append(ids[rel])
+                    targets.append(ids[holder])
+                    weights.append(weight / total)
+            self._edges = (self.version, sources, targets, weights)
+        _version, sources, targets, weights = self._edges
+        focused = [ids[rel] for rel in focus if rel in ids]
+        teleport = [0.0] * count
+        for node in focused or range(count):
+            teleport[node] = 1.0 / (len(focused) or count)
+        start = [self._last_ranks.get(rel, 0.0) for rel in files]
+        total = sum(start)
+        ranks = [value / total for value in start] if total > 0 else list(teleport)
+        has_out = [False] * count
+        for source in sources:
+            has_out[source] = True
+        np = _numpy()
+        if np is not None:
+            source_array = np.array(sources, dtype=np.int64)
+            target_array = np.array(targets, dtype=np.int64)
+            weight_array = np.array(weights, dtype=np.float64)
+            teleport_array = np.array(teleport)
+            dangling = ~np.array(has_out, dtype=bool)
+            vector = np.array(ranks)
+            for iteration in range(1, self.MAX_ITERATIONS + 1):
+                spread = np.bincount(target_array, weights=vector[source_array] * weight_array, minlength=count)
+                updated = (1 - self.DAMPING) * teleport_array + self.DAMPING * (
+                    spread + vector[dangling].sum() * teleport_array
+                )
+                delta = float(np.abs(updated - vector).sum())
+                vector = updated
+                if delta < self.TOLERANCE:
+                    break
+            return vector.tolist(), iteration
+        for iteration in range(1, self.MAX_ITERATIONS + 1):
+            spread = [0.0] * count
+            for source, target, weight in zip(sources, targets, weights):
+                spread[target] += ranks[source] * weight
+            lost = sum(rank for rank, out in zip(ranks, has_out) if not out)
+            updated = [
+                (1 - self.DAMPING) * base + self.DAMPING * (value + lost * base) for base, value in zip(teleport, spread)
+            ]
+            delta = sum(abs(new - old) for new, old in zip(updated, ranks))
+            ranks = updated
+            if delta < self.TOLERANCE:
+                break
+        return ranks, iteration
+
+    def ranked(self, focus: tuple[str, ...]) -> tuple[list[tuple[float, str, list[Any]]], int, bool]:
+        """Definitions as (rank, file, definition), best first; plus PageRank iterations and a cache flag."""
+        key = (self.version, focus)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached[0], cached[1], True
+        files = sorted(self.records)
+        ranks, iterations = self._pagerank(files, focus)
+        file_rank = dict(zip(files, ranks))
+        self._last_ranks = file_rank
+        # A definition earns the share of each referencing file's rank that flows along its name.
+        symbol_rank: dict[tuple[str, str], float] = {}
+        for rel, links in self.links.items():
+            total = self.totals[rel]
+            if not total:
+                continue
+            scale = file_rank[rel] / total
+            for holder, name, weight in links:
+                symbol_rank[(holder, name)] = symbol_rank.get((holder, name), 0.0) + weight * scale
+        result = []
+        for rel in files:
+            definitions = self.records[rel]["definitions"]
+            # Every definition inherits a sliver of its file's rank; definitions in the files the caller named
+            # get a real share so they surface next to what they use.
+            own = file_rank[rel] / math.sqrt(len(definitions) or 1) if rel in focus else file_rank[rel] * 1e-3
+            overloads: dict[str, int] = {}
+            for definition in definitions:
+                overloads[definition[0]] = overloads.get(definition[0], 0) + 1
+            for definition in definitions:
+                # Same-named definitions in one file (methods of sibling classes) split the name's rank.
+                share = symbol_rank.get((rel, definition[0]), 0.0) / overloads[definition[0]]
+                result.append((share + own, rel, definition))
+        result.sort(key=lambda item: (-item[0], item[1], item[2][2]))
+        self._cache[key] = (result, iterations)
+        while len(self._cache) > 16:
+            self._cache.popitem(last=False)
+        return result, iterations, False
+
+
+_REPO_MAPS: OrderedDict[str, _RepoMap] = OrderedDict()
+_REPO_MAP_LIMIT = 8
+
+
+def _estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def _render_repo_map(ranked: list[tuple[float, str, list[Any]]], token_budget: int) -> tuple[str, int, list[dict[str, Any]]]:
+    """Pick the best definitions that fit the budget; render them grouped by file in rank order."""
+    chosen: dict[str, list[tuple[float, list[Any]]]] = {}
+    used = 0
+    for score, rel, definition in ranked:
+        line = f"  {definition[2]}: {definition[3]}\n"
+        cost = _estimate_tokens(line) + (0 if rel in chosen else _estimate_tokens(f"{rel}:\n"))
+        if used + cost > token_budget:
+            continue
+        used += cost
+        chosen.setdefault(rel, []).append((score, definition))
+    lines: list[str] = []
+    files: list[dict[str, Any]] = []
+    for rel, entries in chosen.items():
+        entries.sort(key=lambda entry: entry[1][2])
+        lines.append(f"{rel}:")
+        lines.extend(f"  {definition[2]}: {definition[3]}" for _score, definition in entries)
+        files.append(
+            {
+                "file": rel,
+                "symbols": [
+                    {"name": definition[0], "kind": definition[1], "line": definition[2], "rank": round(score, 6)}
+                    for score, definition in entries
+                ],
+            }
+        )
+    return "\n".join(lines), used, files
 
+
+def register_repomapper(mcp: FastMCP) -> None:
     @mcp.tool()
-    def repomapper_build(root_path: str = ROOT_DEFAULT, max_files: int = 800) -> dict[str, Any]:
+    def repomapper_build(
+        root_path: str = ROOT_DEFAULT,
+        max_files: int = 800,
+        token_budget: int = 2048,
+        focus_files: list[str] | None = None,
+    ) -> dict[str, Any]:
         root = _to_safe_root(root_path)
-        mapped: list[dict[str, Any]] = []
-        for path in _iter_files(root, max_files):
-            content = _read_text(path)
-            functions = function_re.findall(content)
-            classes = class_re.findall(content)
-            if not functions and not classes:
-                continue
-            mapped.append(
-                {
-                    "file": str(path.relative_to(root)).replace("\\", "/"),
-                    "functions": functions[:30],
-                    "classes": classes[:30],
-                }
-            )
-        return {"root": str(root), "files": mapped[:400], "mapped_count": len(mapped)}
+        records: dict[str, dict[str, Any]] = {}
+        walk: dict[str, int] = {}
+        for path in _iter_files(root, max_files, stats=walk):
+            records[str(path.relative_to(root)).replace("\\", "/")] = _SYMBOLS.record(path)
+        _SYMBOLS.flush()
+        state = _REPO_MAPS.get(str(root))
+        if state is None:
+            state = _REPO_MAPS[str(root)] = _RepoMap(str(root))
+            while len(_REPO_MAPS) > _REPO_MAP_LIMIT:
+                _REPO_MAPS.popitem(last=False)
+        _REPO_MAPS.move_to_end(str(root))
+        changed = state.update(records)
+        focus = []
+        for name in focus_files or []:
+            target = (root / name).resolve()
+            focus.append(str(target.relative_to(root)).replace("\\", "/") if root in target.parents else name)
+        ranked, iterations, cached = state.ranked(tuple(sorted(set(focus))))
+        text, used, files = _render_repo_map(ranked, max(64, token_budget))
+        best: dict[str, float] = {}
+        for score, rel, _definition in ranked:
+            best.setdefault(rel, score)
+        mapped = [
+            {
+                "file": rel,
+                "functions": records[rel]["functions"][:30],
+                "classes": records[rel]["classes"][:30],
+            }
+            for rel in sorted(best, key=lambda rel: -best[rel])
+            if records[rel]["functions"] or records[rel]["classes"]
+        ]
+        return {
+            "root": str(root),
+            "mapped_count": len(mapped),
+            "pruned_dirs": walk["pruned_dirs"],
+            "changed_files": changed,
+            "pagerank_iterations": iterations,
+            "ranking_cached": cached,
+            "focus_files": [rel for rel in focus if rel in records],
+            "token_budget": max(64, token_budget),
+            "token_estimate": used,
+            "map": text,
+            "map_files": files,
+            **_CURSORS.open("repomapper_build", "files", mapped, 400),
+        }
+
+    @mcp.tool()
+    def repomapper_build_next(cursor: str) -> dict[str, Any]:
+        return _CURSORS.next_page("repomapper_build", cursor)
 
 
 def register_snyk(mcp: FastMCP) -> None:
@@ -609,106 +4143,409 @@ def register_snyk(mcp: FastMCP) -> None:
     def snyk_scan_workspace(root_path: str = ROOT_DEFAULT, max_files: int = 2000) -> dict[str, Any]:
         root = _to_safe_root(root_path)
         manifests = []
-        for item in root.rglob("*"):
+        walk: dict[str, int] = {}
+        for item in _walk_files(root, stats=walk):
             if len(manifests) >= max_files:
                 break
             if item.name in {"package.json", "requirements.txt", "Pipfile", "pyproject.toml"}:
                 manifests.append(str(item.relative_to(root)).replace("\\", "/"))
-        return {"root": str(root), "manifest_count": len(manifests), "manifests": manifests[:500]}
+        return {
+            "root": str(root),
+            "manifest_count": len(manifests),
+            "pruned_dirs": walk["pruned_dirs"],
+            **_CURSORS.open("snyk_scan_workspace", "manifests", manifests, 500),
+        }
+
+    @mcp.tool()
+    def snyk_scan_workspace_next(cursor: str) -> dict[str, Any]:
+        return _CURSORS.next_page("snyk_scan_workspace", cursor)
+
+
+def _docker_image_summary(image: dict[str, Any]) -> dict[str, Any]:
+    from docker.models.images import Image
+
+    # docker-py's model derives short_id and tags from the raw API dict, so output matches images.list().
+    model = Image(attrs={**image, "Id": image.get("Id", "")})
+    return {"id": model.short_id, "tags": model.tags}
+
+
+def _docker_container_summary(container: dict[str, Any], images: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    names = container.get("Names") or []
+    state = container.get("State")
+    image = images.get(container.get("ImageID", "")) or _docker_image_summary({"Id": container.get("ImageID", "")})
+    return {
+        "id": container.get("Id", "")[:12],
+        "name": names[0].lstrip("/") if names else "",
+        "status": state.get("Status") if isinstance(state, dict) else state,
+        "image": image["tags"][0] if image["tags"] else image["id"],
+    }
+
+
+class _DockerState:
+    """Live container/image model fed by the Docker events stream, fully resynced at startup and after stream gaps."""
+
+    def __init__(self, client: Callable[[], Any], max_changes: int = 5000) -> None:
+        self._client = client
+        self._containers: dict[str, dict[str, Any]] = {}
+        self._images: dict[str, dict[str, Any]] = {}
+        self._changes: deque[tuple[int, str, str, str, float]] = deque(maxlen=max_changes)
+        self._lock = threading.Lock()
+        self._epoch = secrets.token_hex(4)
+        self._seq = 0
+        self._live = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._counters = {"events": 0, "resyncs": 0, "stream_gaps": 0}
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="docker-events", daemon=True)
+            self._thread.start()
+
+    @property
+    def live(self) -> bool:
+        return self._live.is_set()
+
+    def _record(self, kind: str, object_id: str, action: str) -> None:
+        self._seq += 1
+        self._changes.append((self._seq, kind, object_id, action, time.time()))
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                client = self._client()
+                # Subscribe from before the resync so nothing that happens during it is missed.
+                since = int(time.time()) - 1
+                self._resync(client)
+                stream = client.api.events(decode=True, since=since)
+                self._live.set()
+                backoff = 1.0
+                for event in stream:
+                    self._apply(client, event)
+            except Exception:  # noqa: BLE001
+                pass
+            self._live.clear()
+            self._counters["stream_gaps"] += 1
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _resync(self, client: Any) -> None:
+        containers = {item["Id"]: item for item in client.api.containers(all=True)}
+        images = {item["Id"]: item for item in client.api.images()}
+        with self._lock:
+            for kind, current, fresh in (("container", self._containers, containers), ("image", self._images, images)):
+                for object_id in current.keys() - fresh.keys():
+                    self._record(kind, object_id, "removed")
+                for object_id, item in fresh.items():
+                    if object_id not in current:
+                        self._record(kind, object_id, "added")
+                    elif current[object_id] != item:
+                        self._record(kind, object_id, "updated")
+            self._containers = containers
+            self._images = images
+            self._counters["resyncs"] += 1
+
+    def _apply(self, client: Any, event: dict[str, Any]) -> None:
+        kind = event.get("Type")
+        action = str(event.get("Action") or event.get("status") or "")
+        object_id = (event.get("Actor") or {}).get("ID") or event.get("id") or ""
+        self._counters["events"] += 1
+        if kind == "container" and object_id and not action.startswith("exec_"):
+            found = client.api.containers(all=True, filters={"id": object_id})
+            with self._lock:
+                if found:
+                    self._containers[found[0]["Id"]] = found[0]
+                else:
+                    self._containers.pop(object_id, None)
+                self._record("container", object_id, action)
+        elif kind == "image":
+            images = {item["Id"]: item for item in client.api.images()}
+            with self._lock:
+                self._images = images
+                self._record("image", object_id, action)
+
+    def container_records(self, all_containers: bool) -> list[dict[str, Any]]:
+        with self._lock:
+            items = sorted(self._containers.values(), key=lambda item: item.get("Created", 0), reverse=True)
+        return [item for item in items if all_containers or item.get("State") == "running"]
+
+    def containers(self, all_containers: bool) -> list[dict[str, Any]]:
+        with self._lock:
+            images = {image_id: _docker_image_summary(image) for image_id, image in self._images.items()}
+        return [_docker_container_summary(item, images) for item in self.container_records(all_containers)]
+
+    def images(self) -> list[dict[str, Any]]:
+        with self._lock:
+            items = sorted(self._images.values(), key=lambda item: item.get("Created", 0), reverse=True)
+        return [_docker_image_summary(item) for item in items]
+
+    def changes_since(self, token: str) -> dict[str, Any]:
+        with self._lock:
+            current = f"{self._epoch}:{self._seq}"
+            epoch, _, seq_text = token.partition(":")
+            oldest = self._changes[0][0] if self._changes else self._seq + 1
+            try:
+                seq = int(seq_text)
+            except ValueError:
+                seq = -1
+            if epoch != self._epoch or seq < 0 or seq > self._seq or seq + 1 < oldest:
+                return {"token": current, "changes": [], "resync_required": True}
+            changes = [
+                {"type": kind, "id": object_id[:12], "action": action, "time": stamp}
+                for number, kind, object_id, action, stamp in self._changes
+                if number > seq
+            ]
+        return {"token": current, "changes": changes, "resync_required": False}
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "live": self.live,
+                "containers": len(self._containers),
+                "images": len(self._images),
+                "sequence": self._seq,
+                **self._counters,
+            }
+
+
+def _docker_io_totals(sample: dict[str, Any]) -> tuple[int, int, int, int]:
+    networks = sample.get("networks") or {}
+    rx = sum(int(item.get("rx_bytes", 0)) for item in networks.values())
+    tx = sum(int(item.get("tx_bytes", 0)) for item in networks.values())
+    read = write = 0
+    for entry in (sample.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []:
+        op = str(entry.get("op", "")).lower()
+        if op == "read":
+            read += int(entry.get("value", 0))
+        elif op == "write":
+            write += int(entry.get("value", 0))
+    return rx, tx, read, write
+
+
+def _docker_stats_row(first: dict[str, Any], second: dict[str, Any], elapsed: float) -> dict[str, Any]:
+    cpu_now, cpu_before = second.get("cpu_stats") or {}, first.get("cpu_stats") or {}
+    cpu_delta = (cpu_now.get("cpu_usage") or {}).get("total_usage", 0) - (cpu_before.get("cpu_usage") or {}).get(
+        "total_usage", 0
+    )
+    system_delta = cpu_now.get("system_cpu_usage", 0) - cpu_before.get("system_cpu_usage", 0)
+    cpus = cpu_now.get("online_cpus") or len((cpu_now.get("cpu_usage") or {}).get("percpu_usage") or []) or 1
+    cpu_percent = cpu_delta / system_delta * cpus * 100.0 if cpu_delta > 0 and system_delta > 0 else 0.0
+    memory = second.get("memory_stats") or {}
+    # Page cache is reclaimable; subtract it like `docker stats` does (cgroup v2: inactive_file, v1: cache).
+    detail = memory.get("stats") or {}
+    used = max(0, memory.get("usage", 0) - detail.get("inactive_file", detail.get("cache", 0)))
+    limit = memory.get("limit", 0)
+    before, after = _docker_io_totals(first), _docker_io_totals(second)
+    rx, tx, read, write = (max(0, now - then) for now, then in zip(after, before))
+    return {
+        "cpu_percent": round(cpu_percent, 2),
+        "memory_bytes": used,
+        "memory_limit_bytes": limit,
+        "memory_percent": round(used / limit * 100.0, 2) if limit else 0.0,
+        "net_rx_bytes": rx,
+        "net_tx_bytes": tx,
+        "block_read_bytes": read,
+        "block_write_bytes": write,
+        "interval_seconds": round(elapsed, 3),
+    }
 
 
 def register_docker_mcp(mcp: FastMCP) -> None:
     import docker as docker_sdk
 
+    clients: dict[str, Any] = {}
+
+    def _client() -> Any:
+        # One long-lived client keeps its connection pool instead of rebuilding it per call.
+        if "default" not in clients:
+            clients["default"] = docker_sdk.from_env()
+        return clients["default"]
+
+    def _images() -> dict[str, dict[str, Any]]:
+        return {image["Id"]: _docker_image_summary(image) for image in _client().api.images()}
+
+    state = _DockerState(_client)
+    if os.getenv("MCP_ADAPTER_DOCKER_EVENTS", "1").strip() != "0":
+        state.start()
+
     @mcp.tool()
     def docker_health() -> dict[str, Any]:
         try:
-            client = docker_sdk.from_env()
-            ok = client.ping()
-            return {"ok": bool(ok), "socket": os.getenv("DOCKER_HOST", "unix:///var/run/docker.sock")}
+            ok = _client().ping()
+            return {
+                "ok": bool(ok),
+                "socket": os.getenv("DOCKER_HOST", "unix:///var/run/docker.sock"),
+                "state_cache": state.stats(),
+            }
         except Exception as exc:  # noqa: BLE001
             return {"ok": False, "error": str(exc)}
 
     @mcp.tool()
     def docker_list_containers(all_containers: bool = True, limit: int = 50) -> dict[str, Any]:
         try:
-            client = docker_sdk.from_env()
-            containers = client.containers.list(all=all_containers)
-            payload = []
-            for item in containers[: max(1, min(limit, 200))]:
-                payload.append(
-                    {
-                        "id": item.short_id,
-                        "name": item.name,
-                        "status": item.status,
-                        "image": item.image.tags[0] if item.image.tags else item.image.short_id,
-                    }
-                )
-            return {"ok": True, "count": len(payload), "containers": payload}
+            limit = max(1, min(limit, 200))
+            if state.live:
+                payload = state.containers(all_containers)[:limit]
+                return {"ok": True, "count": len(payload), "containers": payload, "source": "events"}
+            # Two bulk calls joined in memory; the model API inspects every container and image separately.
+            containers = _client().api.containers(all=all_containers)
+            images = _images()
+            payload = [_docker_container_summary(item, images) for item in containers[:limit]]
+            return {"ok": True, "count": len(payload), "containers": payload, "source": "daemon"}
         except Exception as exc:  # noqa: BLE001
             return {"ok": False, "error": str(exc)}
 
     @mcp.tool()
     def docker_list_images(limit: int = 80) -> dict[str, Any]:
         try:
-            client = docker_sdk.from_env()
-            images = client.images.list()
-            payload = []
-            for image in images[: max(1, min(limit, 300))]:
-                payload.append(
-                    {
-                        "id": image.short_id,
-                        "tags": image.tags,
-                    }
-                )
-            return {"ok": True, "count": len(payload), "images": payload}
+            limit = max(1, min(limit, 300))
+            if state.live:
+                payload = state.images()[:limit]
+                return {"ok": True, "count": len(payload), "images": payload, "source": "events"}
+            payload = list(_images().values())[:limit]
+            return {"ok": True, "count": len(payload), "images": payload, "source": "daemon"}
+        except Exception as exc:  # noqa: BLE001
+            return {"ok": False, "error": str(exc)}
+
+    def _sample_stats(container_id: str) -> dict[str, Any]:
+        stream = _client().api.stats(container_id, stream=True, decode=True)
+        try:
+            started = time.monotonic()
+            first = next(stream)
+            second = next(stream)
+            return _docker_stats_row(first, second, time.monotonic() - started)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    @mcp.tool()
+    def docker_stats(sort_by: str = "cpu", limit: int = 20) -> dict[str, Any]:
+        sort_keys = {
+            "cpu": "cpu_percent",
+            "memory": "memory_bytes",
+            "net": "net_rx_bytes",
+            "block": "block_read_bytes",
+        }
+        if sort_by not in sort_keys:
+            return {"ok": False, "error": f"Unknown sort_by '{sort_by}'", "available": sorted(sort_keys)}
+        try:
+            started = time.monotonic()
+            running = state.container_records(all_containers=False) if state.live else _client().api.containers()
+            ids = {item["Id"]: _docker_container_summary(item, {})["name"] for item in running}
+            rows: list[dict[str, Any]] = []
+            errors: list[dict[str, str]] = []
+            if ids:
+                # Each sample waits one daemon interval (~1s), so sample every container at once.
+                workers = max(1, min(len(ids), _env_int("MCP_ADAPTER_DOCKER_STATS_WORKERS", 64)))
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="docker-stats") as pool:
+                    futures = {container_id: pool.submit(_sample_stats, container_id) for container_id in ids}
+                    for container_id, future in futures.items():
+                        try:
+                            row = future.result()
+                        except Exception as exc:  # noqa: BLE001
+                            errors.append({"id": container_id[:12], "error": str(exc)})
+                            continue
+                        rows.append({"id": container_id[:12], "name": ids[container_id], **row})
+            rows.sort(key=lambda row: row[sort_keys[sort_by]], reverse=True)
+            return {
+                "ok": True,
+                "sampled": len(rows),
+                "elapsed_seconds": round(time.monotonic() - started, 3),
+                "containers": rows[: max(1, min(limit, 200))],
+                "errors": errors,
+            }
         except Exception as exc:  # noqa: BLE001
             return {"ok": False, "error": str(exc)}
 
+    @mcp.tool()
+    def docker_changes_since(token: str = "") -> dict[str, Any]:
+        if not state.live:
+            return {"ok": False, "error": "Docker events stream is not connected; poll docker_list_containers instead."}
+        return {"ok": True, **state.changes_since(token)}
+
+
+REGISTRARS: dict[str, Callable[[FastMCP], None]] = {
+    "augments": register_augments,
+    "arxiv": register_arxiv,
+    "cloudflare": register_cloudflare,
+    "codegraph": register_codegraph,
+    "docker-mcp": register_docker_mcp,
+    "filescopemcp": register_filescope,
+    "gitleaks": register_gitleaks,
+    "lsmcp": register_lsmcp,
+    "nexus": register_nexus,
+    "ragdocs": register_ragdocs,
+    "react": register_react,
+    "repomapper": register_repomapper,
+    "searxng": register_searxng,
+    "semgrep": register_semgrep,
+    "shadcn": register_shadcn,
+    "snyk": register_snyk,
+    "vue": register_vue,
+}
+# Mode groups register several tool families in one process so they share the file index and content cache.
+MODE_GROUPS: dict[str, tuple[str, ...]] = {
+    "all-local": (
+        "augments",
+        "codegraph",
+        "filescopemcp",
+        "gitleaks",
+        "lsmcp",
+        "ragdocs",
+        "react",
+        "repomapper",
+        "semgrep",
+        "shadcn",
+        "snyk",
+        "vue",
+    ),
+}
+
+
+def _expand_modes(modes: str | list[str] | tuple[str, ...]) -> list[str]:
+    requested = modes.split(",") if isinstance(modes, str) else list(modes)
+    expanded: list[str] = []
+    for item in requested:
+        name = item.strip()
+        if not name:
+            continue
+        for mode in MODE_GROUPS.get(name, (name,)):
+            if mode not in REGISTRARS:
+                raise ValueError(f"Unsupported adapter mode: {mode}")
+            if mode not in expanded:
+                expanded.append(mode)
+    if not expanded:
+        raise ValueError("At least one adapter mode is required")
+    return expanded
+
 
-def build_server(mode: str) -> FastMCP:
-    mcp = FastMCP(f"{mode}-adapter")
+def build_server(modes: str | list[str] | tuple[str, ...]) -> FastMCP:
+    selected = _expand_modes(modes)
+    label = modes if isinstance(modes, str) else "+".join(modes)
+    mcp = FastMCP(f"{label}-adapter")
 
     @mcp.tool()
     def adapter_health() -> dict[str, Any]:
-        return {"mode": mode, "status": "ok", "workspace": ROOT_DEFAULT}
-
-    if mode == "augments":
-        register_augments(mcp)
-    elif mode == "arxiv":
-        register_arxiv(mcp)
-    elif mode == "cloudflare":
-        register_cloudflare(mcp)
-    elif mode == "codegraph":
-        register_codegraph(mcp)
-    elif mode == "filescopemcp":
-        register_filescope(mcp)
-    elif mode == "lsmcp":
-        register_lsmcp(mcp)
-    elif mode == "gitleaks":
-        register_gitleaks(mcp)
-    elif mode == "nexus":
-        register_nexus(mcp)
-    elif mode == "ragdocs":
-        register_ragdocs(mcp)
-    elif mode == "react":
-        register_react(mcp)
-    elif mode == "repomapper":
-        register_repomapper(mcp)
-    elif mode == "semgrep":
-        register_semgrep(mcp)
-    elif mode == "searxng":
-        register_searxng(mcp)
-    elif mode == "shadcn":
-        register_shadcn(mcp)
-    elif mode == "snyk":
-        register_snyk(mcp)
-    elif mode == "vue":
-        register_vue(mcp)
-    elif mode == "docker-mcp":
-        register_docker_mcp(mcp)
-    else:
-        raise ValueError(f"Unsupported adapter mode: {mode}")
+        return {"mode": label, "modes": selected, "status": "ok", "workspace": ROOT_DEFAULT}
+
+    @mcp.tool()
+    def adapter_cache_stats() -> dict[str, Any]:
+        return {
+            "file_index": _FILE_INDEX.stats(),
+            "content_cache": _CONTENT_CACHE.stats(),
+            "cursors": _CURSORS.stats(),
+            "http": _HTTP.stats(),
+            "search_responses": _RESPONSES.stats(),
+            "ragdocs": _RAG_INDEX.stats(),
+            "symbols": _SYMBOLS.stats(),
+            "import_graphs": [graph.stats() for graph in _IMPORT_GRAPHS.values()],
+            "symbol_tables": [table.stats() for table in _SYMBOL_TABLES.values()],
+            "filescope_watches": [watch.stats() for watch in _FILESCOPE_WATCHES.values()],
+        }
+
+    for mode in selected:
+        REGISTRARS[mode](mcp)
     return mcp
 
 
@@ -717,25 +4554,9 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--mode",
         required=True,
-        choices=[
-            "augments",
-            "arxiv",
-            "cloudflare",
-            "codegraph",
-            "docker-mcp",
-            "filescopemcp",
-            "gitleaks",
-            "lsmcp",
-            "nexus",
-            "ragdocs",
-            "react",
-            "repomapper",
-            "searxng",
-            "semgrep",
-            "shadcn",
-            "snyk",
-            "vue",
-        ],
+        nargs="+",
+        choices=sorted([*REGISTRARS, *MODE_GROUPS]),
+        help="One or more adapter modes (or a group such as all-local) served from a single process.",
     )
     return parser.parse_args()
 
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import http.server
+import json
+import os
+import pathlib
+import sys
+import threading
+import urllib.parse
+from collections import Counter
+from typing import Any, Callable
+
+import pytest
+
+# Keep the module-level caches in memory so tests never touch the shared workspace cache dir.
+os.environ["MCP_ADAPTER_CACHE_DIR"] = "off"
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import mcp_adapter_server  # noqa: E402
+
+
+@pytest.fixture
+def server_module():
+    return mcp_adapter_server
+
+
+@pytest.fixture
+def workspace(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> pathlib.Path:
+    root = tmp_path.resolve()
+    monkeypatch.setattr(mcp_adapter_server, "ROOT_DEFAULT", str(root))
+    return root
+
+
+@pytest.fixture
+def call_tool():
+    """Call a tool of a freshly built server the way an MCP client would and return its structured result."""
+
+    def call(modes: str, name: str, **arguments):
+        server = mcp_adapter_server.build_server(modes)
+        _content, structured = asyncio.run(server.call_tool(name, arguments))
+        return structured
+
+    return call
+
+
+class StandIn:
+    """A local HTTP server standing in for an upstream API.
+
+    ``routes`` maps a path to ``handler(query) -> (status, headers, json body)``; handlers run on server
+    threads, so they may sleep to hold a request open. ``hits`` counts requests per path and ``peak`` is
+    the most requests that were in flight at once.
+    """
+
+    def __init__(self) -> None:
+        self.routes: dict[str, Callable[[dict[str, str]], tuple[int, dict[str, str], Any]]] = {}
+        self.hits: Counter[str] = Counter()
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        stand_in = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                parts = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(parts.query))
+                with stand_in.lock:
+                    stand_in.hits[parts.path] += 1
+                    stand_in.active += 1
+                    stand_in.peak = max(stand_in.peak, stand_in.active)
+                try:
+                    status, headers, body = stand_in.routes[parts.path](query)
+                finally:
+                    with stand_in.lock:
+                        stand_in.active -= 1
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *_args: Any) -> None:
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    try:
+        yield server
+    finally:
+        server.close()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+import pytest
+
+
+def _flaky(failures: int, retry_after: str):
+    calls = {"count": 0}
+
+    def handler(_query: dict[str, str]):
+        calls["count"] += 1
+        if calls["count"] <= failures:
+            return 429, {"Retry-After": retry_after}, {"error": "slow down"}
+        return 200, {}, {"ok": True}
+
+    return handler
+
+
+def test_backoff_honours_retry_after(server_module, stand_in) -> None:
+    stand_in.routes["/flaky"] = _flaky(2, "0.2")
+    pool = server_module._HttpPool(8, 6)
+    started = time.monotonic()
+    response = asyncio.run(pool.get_with_backoff(f"{stand_in.url}/flaky"))
+    elapsed = time.monotonic() - started
+    assert response.status_code == 200
+    assert stand_in.hits["/flaky"] == 3
+    assert pool.stats()["retries"] == 2
+    assert elapsed >= 0.4
+
+
+def test_backoff_does_not_sleep_after_the_last_attempt(server_module, stand_in) -> None:
+    stand_in.routes["/down"] = _flaky(100, "0.3")
+    pool = server_module._HttpPool(8, 6)
+    started = time.monotonic()
+    response = asyncio.run(pool.get_with_backoff(f"{stand_in.url}/down", attempts=3))
+    elapsed = time.monotonic() - started
+    assert response.status_code == 429
+    assert stand_in.hits["/down"] == 3
+    assert pool.stats()["retries"] == 2
+    assert 0.6 <= elapsed < 0.85
+
+
+def test_per_host_concurrency_cap(server_module, stand_in) -> None:
+    def slow(_query: dict[str, str]):
+        time.sleep(0.1)
+        return 200, {}, {}
+
+    stand_in.routes["/slow"] = slow
+    pool = server_module._HttpPool(16, 2)
+
+    async def burst() -> list[int]:
+        responses = await asyncio.gather(*(pool.get(f"{stand_in.url}/slow") for _ in range(8)))
+        return [response.status_code for response in responses]
+
+    assert asyncio.run(burst()) == [200] * 8
+    assert stand_in.peak == 2
+
+
+@pytest.fixture
+def cloudflare(server_module, stand_in, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("CLOUDFLARE_API_URL", stand_in.url)
+    monkeypatch.setenv("CLOUDFLARE_API_TOKEN", "test-token")
+    monkeypatch.setattr(server_module, "_HTTP", server_module._HttpPool(32, 6))
+    return stand_in
+
+
+def _zones(total_pages: int, throttled: set[int], missing: set[int]):
+    throttled = set(throttled)
+
+    def handler(query: dict[str, str]):
+        page, per_page = int(query["page"]), int(query["per_page"])
+        time.sleep(0.02)
+        if page in missing:
+            return 404, {}, {"success": False}
+        if page in throttled:
+            throttled.discard(page)
+            return 429, {"Retry-After": "0"}, {"success": False}
+        first = (page - 1) * per_page
+        # Each page repeats the previous page's last zone, as offset pagination does when zones are added.
+        ids = ([first - 1] if page > 1 else []) + list(range(first, first + per_page))
+        result = [{"id": f"z{number}", "name": f"zone{number}.example", "status": "active"} for number in ids]
+        return 200, {}, {"success": True, "result": result, "result_info": {"page": page, "total_pages": total_pages}}
+
+    return handler
+
+
+def test_list_zones_merges_all_pages(call_tool, cloudflare) -> None:
+    cloudflare.routes["/zones"] = _zones(18, throttled={1, 5, 11}, missing=set())
+    result = call_tool("cloudflare", "cloudflare_list_zones", all_pages=True)
+    assert result["ok"] is True
+    assert result["page_count"] == 18
+    assert result["failed_pages"] == []
+    ids = [zone["id"] for zone in result["zones"]]
+    assert ids == [f"z{number}" for number in range(18 * 50)]
+    assert cloudflare.hits["/zones"] == 18 + 3
+    # Page 1 is fetched alone; the rest share MCP_ADAPTER_CLOUDFLARE_CONCURRENCY (4) slots.
+    assert 1 < cloudflare.peak <= 4
+
+
+def test_list_zones_reports_failed_pages(call_tool, cloudflare) -> None:
+    cloudflare.routes["/zones"] = _zones(3, throttled=set(), missing={2})
+    result = call_tool("cloudflare", "cloudflare_list_zones", all_pages=True)
+    assert result["ok"] is False
+    assert result["failed_pages"] == [2]
+    # Page 3 still carries the zone it repeats from the missing page 2.
+    assert [zone["id"] for zone in result["zones"]] == [f"z{number}" for number in [*range(50), *range(99, 150)]]
+
+
+def test_requests_are_not_logged_at_info(server_module, stand_in, caplog: pytest.LogCaptureFixture) -> None:
+    # FastMCP configures the root logger at INFO.
+    caplog.set_level(logging.INFO)
+    stand_in.routes["/quiet"] = _flaky(0, "0")
+    asyncio.run(server_module._HttpPool(8, 6).get(f"{stand_in.url}/quiet"))
+    assert not [record for record in caplog.records if record.name.startswith("httpx")]
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pathlib
+import shutil
+import subprocess
+
+import pytest
+
+GITIGNORE = """\
+/out/
+/build-root
+gen/
+*.log
+!keep.log
+docs/*.tmp
+**/cache-*/
+/anchored.txt
+nested/deep/
+"""
+
+FILES = [
+    "out/gen.py",
+    "sub/out/gen.py",
+    "build-root/a.py",
+    "sub/build-root/a.py",
+    "gen/a.py",
+    "sub/gen/a.py",
+    "a.log",
+    "sub/keep.log",
+    "sub/b.log",
+    "docs/x.tmp",
+    "sub/docs/x.tmp",
+    "docs/x.md",
+    "cache-one/a.py",
+    "sub/cache-two/a.py",
+    "anchored.txt",
+    "sub/anchored.txt",
+    "nested/deep/a.py",
+    "sub/nested/deep/a.py",
+    "main.py",
+]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_walk_matches_git_check_ignore(server_module, workspace: pathlib.Path) -> None:
+    subprocess.run(["git", "init", "-q", str(workspace)], check=True)
+    (workspace / ".gitignore").write_text(GITIGNORE)
+    for rel in FILES:
+        target = workspace / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text("x\n")
+
+    result = subprocess.run(
+        ["git", "check-ignore", "--stdin"],
+        cwd=workspace,
+        input="\n".join(FILES),
+        capture_output=True,
+        text=True,
+    )
+    git_ignored = set(result.stdout.split())
+    walked = {
+        str(path.relative_to(workspace)).replace("\\", "/") for path in server_module._walk_files(workspace)
+    }
+
+    assert {rel for rel in FILES if rel not in walked} == git_ignored
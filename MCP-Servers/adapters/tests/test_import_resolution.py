@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import importlib.util
+import pathlib
+import random
+import sys
+
+import pytest
+
+PY_TREE = [
+    "cgapp/__init__.py",
+    "cgapp/settings.py",
+    "cgapp/core/__init__.py",
+    "cgapp/core/models.py",
+    "cgapp/core/utils.py",
+    "cgapp/core/store/__init__.py",
+    "cgapp/core/store/sql.py",
+    # A module shadowed by the package of the same name: the import system picks the package.
+    "cgapp/core/store.py",
+    "cgapp/api/__init__.py",
+    "cgapp/api/views.py",
+    "cgapp/api/helpers/__init__.py",
+    "cgapp/api/helpers/auth.py",
+    "cgtop.py",
+]
+NAMES = ["models", "utils", "store", "sql", "views", "helpers", "auth", "settings", "missing", "core", "api"]
+
+
+def _module_name(rel: str) -> str:
+    parts = rel[: -len(".py")].split("/")
+    return ".".join(parts[:-1] if parts[-1] == "__init__" else parts)
+
+
+@pytest.fixture
+def python_tree(workspace: pathlib.Path):
+    for rel in PY_TREE:
+        target = workspace / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text("")
+    sys.path.insert(0, str(workspace))
+    try:
+        yield workspace
+    finally:
+        sys.path.remove(str(workspace))
+        for name in [name for name in sys.modules if name.split(".")[0] in {"cgapp", "cgtop"}]:
+            del sys.modules[name]
+
+
+def _expected(root: pathlib.Path, absolute: str, names: list[str]) -> list[str]:
+    """What the import system loads from root: requested submodules, else the module itself."""
+
+    def origin(name: str) -> str | None:
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            return None
+        if spec is None or spec.origin is None:
+            return None
+        path = pathlib.Path(spec.origin).resolve()
+        return str(path.relative_to(root)).replace("\\", "/") if root in path.parents else None
+
+    target = origin(absolute)
+    resolved = [found for found in (origin(f"{absolute}.{name}") for name in names) if found]
+    if target and len(resolved) < len(names):
+        resolved.append(target)
+    return resolved or ([target] if target else [])
+
+
+def test_python_imports_match_importlib(server_module, python_tree: pathlib.Path) -> None:
+    files = {rel: index for index, rel in enumerate(PY_TREE)}
+    modules = sorted({_module_name(rel) for rel in PY_TREE}) + ["os", "json", "requests", "cgapp.nothing"]
+    rng = random.Random(22)
+    checked = 0
+    for importer in PY_TREE:
+        package = _module_name(importer) if importer.endswith("__init__.py") else _module_name(importer).rpartition(".")[0]
+        relative = [
+            "." * level + suffix
+            for level in (1, 2, 3)
+            for suffix in ("", "core", "core.store", "api.helpers", "models", "helpers", "store")
+        ]
+        for module in modules + relative:
+            names = rng.sample(NAMES, rng.randint(0, 3)) if rng.random() < 0.7 else []
+            if module.startswith("."):
+                if not package:
+                    continue
+                try:
+                    absolute = importlib.util.resolve_name(module, package)
+                except ImportError:
+                    continue
+            else:
+                absolute = module
+            expected = _expected(python_tree, absolute, names)
+            got = server_module._resolve_import(importer, module, names, files)
+            assert sorted(got) == sorted(expected), (importer, module, names)
+            checked += 1
+    assert checked > 200
+
+
+JS_FILES = [
+    "web/src/index.ts",
+    "web/src/app.tsx",
+    "web/src/lib/api.ts",
+    "web/src/lib/index.ts",
+    "web/src/util.js",
+    "web/src/components/Button.vue",
+    "web/src/components/index.jsx",
+    "web/server/main.mjs",
+]
+
+JS_CASES = [
+    ("web/src/app.tsx", "./lib/api", ["web/src/lib/api.ts"]),
+    ("web/src/app.tsx", "./lib/api.js", ["web/src/lib/api.ts"]),
+    ("web/src/app.tsx", "./lib", ["web/src/lib/index.ts"]),
+    ("web/src/app.tsx", "./util", ["web/src/util.js"]),
+    ("web/src/app.tsx", "./util.js", ["web/src/util.js"]),
+    ("web/src/app.tsx", "./components", ["web/src/components/index.jsx"]),
+    ("web/src/app.tsx", "./components/Button.vue", ["web/src/components/Button.vue"]),
+    ("web/src/lib/api.ts", "../app", ["web/src/app.tsx"]),
+    ("web/src/lib/api.ts", "@/util", ["web/src/util.js"]),
+    ("web/src/lib/api.ts", "~/lib/api", ["web/src/lib/api.ts"]),
+    ("web/server/main.mjs", "../src/index.js", ["web/src/index.ts"]),
+    ("web/server/main.mjs", "@/app", ["web/src/app.tsx"]),
+    ("web/src/app.tsx", "./missing", []),
+    ("web/src/app.tsx", "react", []),
+    ("web/src/app.tsx", "@scope/pkg", []),
+]
+
+
+@pytest.mark.parametrize(("importer", "module", "expected"), JS_CASES)
+def test_js_imports(server_module, importer: str, module: str, expected: list[str]) -> None:
+    files = {rel: index for index, rel in enumerate(JS_FILES)}
+    assert server_module._resolve_import(importer, module, [], files) == expected
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import array
+import os
+import pathlib
+import random
+
+import pytest
+
+WORDS = ["alpha", "beta", "gamma", "delta", "omega", "retry", "cache", "token"]
+
+
+def _postings(rng: random.Random, count: int) -> list[tuple[int, list[int]]]:
+    postings = []
+    chunk_id = 0
+    for _ in range(count):
+        chunk_id += rng.choice([1, 1, 2, 3, 200, 70000])
+        positions = sorted(rng.sample(range(rng.choice([5, 300, 100000])), rng.randint(1, 4)))
+        postings.append((chunk_id, positions))
+    return postings
+
+
+def _encode(server_module, postings: list[tuple[int, list[int]]]) -> tuple[int, bytes, bytes, bytes]:
+    data, packed, skips = server_module._encode_postings(
+        [chunk_id for chunk_id, _positions in postings],
+        [len(positions) for _chunk_id, positions in postings],
+        [position for _chunk_id, positions in postings for position in positions],
+    )
+    return postings[-1][0], data, packed, skips
+
+
+def test_varint_round_trip(server_module) -> None:
+    values = [0, 1, 127, 128, 255, 16383, 16384, 2**32 - 1, 2**40 + 3]
+    values += random.Random(19).sample(range(2**35), 200)
+    out = bytearray()
+    for value in values:
+        server_module._encode_varint(value, out)
+    offset = 0
+    for value in values:
+        decoded, offset = server_module._read_varint(bytes(out), offset)
+        assert decoded == value
+    assert offset == len(out)
+
+
+def test_postings_decode_to_input(server_module) -> None:
+    rng = random.Random(19)
+    for count in (1, 63, 64, 65, 500):
+        postings = _postings(rng, count)
+        _last, data, _packed, _skips = _encode(server_module, postings)
+        expected = [(chunk_id, len(positions)) for chunk_id, positions in postings]
+        assert list(server_module._decode_postings(data)) == expected
+
+
+def test_cursor_matches_naive_scan(server_module) -> None:
+    rng = random.Random(1919)
+    for _ in range(40):
+        postings = _postings(rng, rng.randint(1, 700))
+        cuts = sorted(rng.sample(range(1, len(postings)), min(len(postings) - 1, rng.randint(0, 3))))
+        segments = [
+            _encode(server_module, postings[start:end])
+            for start, end in zip([0, *cuts], [*cuts, len(postings)])
+        ]
+        lengths = array.array("I", [1]) * (postings[-1][0] + 1)
+        for chunk_id, _positions in postings:
+            if rng.random() < 0.25:
+                lengths[chunk_id] = 0
+        live = [(chunk_id, positions) for chunk_id, positions in postings if lengths[chunk_id]]
+        cursor = server_module._PostingCursor(segments, lengths, len(postings))
+        target = 0
+        while True:
+            expected = next(((chunk_id, positions) for chunk_id, positions in live if chunk_id >= target), None)
+            doc = cursor.advance(target)
+            if expected is None:
+                assert doc == server_module._EXHAUSTED
+                break
+            assert doc == expected[0]
+            assert cursor.frequency == len(expected[1])
+            if rng.random() < 0.5:
+                assert cursor.positions() == expected[1]
+            target = doc + rng.choice([1, 1, 2, 150, 5000, 90000])
+
+
+def _spans(node: tuple, tokens: list[str]) -> set[tuple[int, int]]:
+    kind = node[0]
+    if kind == "term":
+        return {(index, index) for index, token in enumerate(tokens) if token == node[1]}
+    if kind == "phrase":
+        size = len(node[1])
+        return {
+            (index, index + size - 1)
+            for index in range(len(tokens) - size + 1)
+            if tokens[index : index + size] == node[1]
+        }
+    if kind == "near":
+        left, right = _spans(node[1], tokens), _spans(node[2], tokens)
+        return {
+            (min(a, c), max(b, d)) for a, b in left for c, d in right if max(c - b, a - d) <= node[3]
+        }
+    return set().union(*(_spans(child, tokens) for child in node[1]))
+
+
+def _matches(node: tuple, tokens: list[str]) -> bool:
+    kind = node[0]
+    if kind == "and":
+        return all(_matches(child, tokens) for child in node[1]) and not any(
+            _matches(child, tokens) for child in node[2]
+        )
+    if kind == "or":
+        return any(_matches(child, tokens) for child in node[1])
+    return bool(_spans(node, tokens))
+
+
+def _random_query(rng: random.Random, depth: int = 0) -> str:
+    def positional() -> str:
+        choice = rng.random()
+        if choice < 0.5:
+            return rng.choice(WORDS)
+        if choice < 0.8:
+            return '"' + " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 3))) + '"'
+        return f"{rng.choice(WORDS)} NEAR/{rng.randint(0, 4)} {rng.choice(WORDS)}"
+
+    if depth >= 2 or rng.random() < 0.3:
+        return positional()
+    left, right = _random_query(rng, depth + 1), _random_query(rng, depth + 1)
+    operator = rng.choice(["AND", "OR", "AND NOT", ""])
+    return f"({left} {operator} {right})" if rng.random() < 0.5 else f"{left} {operator} {right}"
+
+
+@pytest.fixture
+def rag_index(server_module, tmp_path: pathlib.Path):
+    # A tiny flush threshold spreads every term over several segments.
+    index = server_module._RagIndex(None, 6, 2, 4000, 400, 1, 12)
+    rng = random.Random(7)
+    documents = {}
+    for number in range(60):
+        lines = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 8))) for _ in range(rng.randint(1, 20))]
+        path = tmp_path / f"doc{number}.md"
+        path.write_text("\n".join(lines))
+        documents[f"doc{number}.md"] = path
+        index.add(f"doc{number}.md", path, os.stat(path), path.read_text())
+    index.commit()
+    # Tombstones stay in the segments until a merge, so the cursors must skip them.
+    index.remove([f"doc{number}.md" for number in range(0, 60, 7)])
+    index.commit()
+    return index, documents
+
+
+def test_structured_queries_match_naive_evaluator(server_module, rag_index) -> None:
+    index, documents = rag_index
+    db = index._connect()
+    chunks = {
+        chunk_id: server_module._tokenize(documents[key].read_text()[start:end])
+        for chunk_id, key, start, end in db.execute("SELECT id, file_key, start, end FROM chunks")
+    }
+    assert index._meta(db, "dead_chunks") > 0
+    rng = random.Random(42)
+    for _ in range(300):
+        query = _random_query(rng)
+        try:
+            tree = server_module._parse_rag_query(query)
+        except ValueError:
+            continue
+        plan = index._plan(db, tree)
+        found = []
+        doc = plan.advance(0)
+        while doc < server_module._EXHAUSTED:
+            found.append(doc)
+            doc = plan.advance(doc + 1)
+        expected = sorted(chunk_id for chunk_id, tokens in chunks.items() if _matches(tree, tokens))
+        assert found == expected, query
+
+
+def test_parser_precedence(server_module) -> None:
+    parse = server_module._parse_rag_query
+    assert parse("a OR b c") == ("or", [("term", "a"), ("and", [("term", "b"), ("term", "c")], [])])
+    assert parse('"a b" NEAR/3 c') == ("near", ("phrase", ["a", "b"]), ("term", "c"), 3)
+    assert parse("a NOT (b OR c)") == ("and", [("term", "a")], [("or", [("term", "b"), ("term", "c")])])
+    with pytest.raises(ValueError):
+        parse("NOT a")
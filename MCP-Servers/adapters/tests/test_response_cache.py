@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import pathlib
+import time
+
+import pytest
+
+
+@pytest.fixture
+def searxng(server_module, stand_in, monkeypatch: pytest.MonkeyPatch):
+    def search(query: dict[str, str]):
+        time.sleep(0.05)
+        version = stand_in.hits["/search"]
+        return 200, {}, {"results": [{"title": f"v{version}", "url": "https://example.com", "content": query["q"]}]}
+
+    stand_in.routes["/search"] = search
+    monkeypatch.setenv("SEARXNG_URL", stand_in.url)
+    monkeypatch.setattr(server_module, "_HTTP", server_module._HttpPool(8, 6))
+    return stand_in
+
+
+def _use_cache(server_module, monkeypatch: pytest.MonkeyPatch, db_path: pathlib.Path | None = None, ttl: int = 3600):
+    cache = server_module._ResponseCache(db_path, ttl, 3600, 64)
+    monkeypatch.setattr(server_module, "_RESPONSES", cache)
+    return cache
+
+
+def _run(server_module, scenario) -> None:
+    server = server_module.build_server("searxng")
+
+    async def search(query: str) -> dict:
+        _content, structured = await server.call_tool("searxng_search", {"query": query})
+        return structured
+
+    asyncio.run(scenario(search))
+
+
+def test_normalised_queries_hit_the_cache(server_module, searxng, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = _use_cache(server_module, monkeypatch)
+
+    async def scenario(search) -> None:
+        first = await search("Retry  Budgets")
+        second = await search("retry budgets")
+        assert (first["cache"], second["cache"]) == ("miss", "hit")
+        assert second["results"] == first["results"]
+        assert second["query"] == "retry budgets"
+
+    _run(server_module, scenario)
+    assert searxng.hits["/search"] == 1
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_stale_entries_are_served_while_refreshing(server_module, searxng, monkeypatch: pytest.MonkeyPatch) -> None:
+    # With no fresh window every hit is stale, so each one is served at once and refreshed behind it.
+    cache = _use_cache(server_module, monkeypatch, ttl=0)
+
+    async def scenario(search) -> None:
+        assert (await search("swr"))["results"][0]["title"] == "v1"
+        stale = await search("swr")
+        assert stale["cache"] == "stale"
+        assert stale["results"][0]["title"] == "v1"
+        for _ in range(100):
+            if searxng.hits["/search"] == 2 and not cache._inflight:
+                break
+            await asyncio.sleep(0.02)
+        refreshed = await search("swr")
+        assert refreshed["cache"] == "stale"
+        assert refreshed["results"][0]["title"] == "v2"
+
+    _run(server_module, scenario)
+    assert cache.stats()["refreshes"] >= 1
+
+
+def test_concurrent_misses_share_one_request(server_module, searxng, monkeypatch: pytest.MonkeyPatch) -> None:
+    _use_cache(server_module, monkeypatch)
+
+    async def scenario(search) -> None:
+        results = await asyncio.gather(*(search("thundering herd") for _ in range(5)))
+        assert {result["cache"] for result in results} == {"miss"}
+        assert len({result["results"][0]["title"] for result in results}) == 1
+
+    _run(server_module, scenario)
+    assert searxng.hits["/search"] == 1
+
+
+def test_sqlite_tier_survives_a_restart(
+    server_module, searxng, monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> None:
+    db_path = tmp_path / "cache" / "responses.sqlite3"
+    _use_cache(server_module, monkeypatch, db_path)
+
+    async def first_run(search) -> None:
+        assert (await search("durable"))["cache"] == "miss"
+
+    _run(server_module, first_run)
+    # A new cache on the same file stands in for a restarted server with an empty memory tier.
+    cache = _use_cache(server_module, monkeypatch, db_path)
+
+    async def second_run(search) -> None:
+        assert (await search("durable"))["cache"] == "hit"
+
+    _run(server_module, second_run)
+    assert searxng.hits["/search"] == 1
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["disk_entries"] == 1
+
+
+def test_cache_dir_off_disables_the_sqlite_tier(
+    server_module, monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> None:
+    monkeypatch.setenv("MCP_ADAPTER_CACHE_DIR", "off")
+    assert server_module._build_response_cache().stats()["disk_entries"] is None
+    monkeypatch.setenv("MCP_ADAPTER_CACHE_DIR", str(tmp_path))
+    assert server_module._build_response_cache().stats()["disk_entries"] == 0
+    assert (tmp_path / "responses.sqlite3").exists()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import random
+import re
+
+SPEC = (
+    ("aws_access_key", r"\b(AKIA|ASIA)[A-Z0-9]{16}\b", ("AKIA", "ASIA")),
+    ("slack_token", r"\bxox[baprs]-[A-Za-z0-9-]{10,}\b", ("xoxb-", "xoxa-", "xoxp-")),
+    ("eval", r"\beval\s*\(", ("eval",)),
+    ("password", r"(?i)\b(password|pwd)\b\s*[:=]\s*['\"].+['\"]", ("passw", "pwd")),
+    ("http", r"(?i)http://[A-Za-z0-9._/-]+", ("http://",)),
+    ("todo", r"(?i)\btodo\b", ()),
+    ("hex", r"\b[0-9a-f]{8}\b", ()),
+)
+
+FRAGMENTS = [
+    "AKIA",
+    "ASIA",
+    "ABCDEFGHIJKLMNOP",
+    "0123456789",
+    "xoxb-",
+    "xoxp-abc",
+    "eval",
+    "eval (",
+    "EVAL(",
+    "PASSWORD = 'x'",
+    "pwd:\"y\"",
+    "http://",
+    "HTTP://host/a",
+    "TODO",
+    "todo",
+    "deadbeef",
+    "İ",
+    " ",
+    "\n",
+    "=",
+    "(",
+    "'",
+    "-",
+    "a",
+]
+
+
+def _naive(content: str) -> list[tuple[str, int, int]]:
+    found = []
+    for name, pattern, _literals in SPEC:
+        found.extend((name, match.start(), match.end()) for match in re.finditer(pattern, content))
+    order = {name: index for index, (name, _pattern, _literals) in enumerate(SPEC)}
+    return sorted(found, key=lambda item: (order[item[0]], item[1]))
+
+
+def test_matcher_equals_per_rule_finditer(server_module) -> None:
+    matcher = server_module._MultiPatternMatcher(SPEC)
+    rng = random.Random(6)
+    for _ in range(2000):
+        content = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 40)))
+        got = [(matcher.names[index], match.start(), match.end()) for index, match in matcher.matches(content)]
+        assert got == _naive(content), content
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import pathlib
+
+import pytest
+
+
+@pytest.fixture
+def ts_workspace(server_module, workspace: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> pathlib.Path:
+    monkeypatch.setattr(server_module, "_SYMBOL_TABLES", server_module.OrderedDict())
+    (workspace / "src").mkdir()
+    (workspace / "src" / "app.ts").write_text("export function alphaOne() {}\n")
+    return workspace
+
+
+def _find(call_tool, root: pathlib.Path, query: str) -> dict:
+    return call_tool("lsmcp", "lsmcp_find_symbol", query=query, root_path=str(root))
+
+
+def test_queries_inside_the_recheck_interval_do_not_stat_the_workspace(
+    server_module, call_tool, ts_workspace: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(server_module, "_SYMBOL_RECHECK_SECONDS", 3600)
+    assert _find(call_tool, ts_workspace, "alphaOne")["rebuilt"] is True
+
+    def fail(*_args):
+        raise AssertionError("revalidated inside the recheck interval")
+
+    monkeypatch.setattr(server_module, "_mtimes_unchanged", fail)
+    monkeypatch.setattr(server_module, "_stamps_unchanged", fail)
+    for query in ("alpha", "alphaOne", "nothingLikeThis"):
+        result = _find(call_tool, ts_workspace, query)
+        assert result["rebuilt"] is False
+        assert result["lookup_ms"] >= 0
+
+
+def test_changes_are_picked_up_once_the_interval_passes(
+    server_module, call_tool, ts_workspace: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(server_module, "_SYMBOL_RECHECK_SECONDS", 0)
+    assert _find(call_tool, ts_workspace, "betaTwo")["rebuilt"] is True
+    # An edit in place only changes the file's stamp.
+    (ts_workspace / "src" / "app.ts").write_text("export function alphaOne() {}\nexport class BetaTwo {}\n")
+    result = _find(call_tool, ts_workspace, "betaTwo")
+    assert result["rebuilt"] is True
+    assert [(hit["name"], hit["match"]) for hit in result["results"]][:1] == [("BetaTwo", "exact")]
+    # A new file changes its directory's mtime.
+    (ts_workspace / "src" / "extra.ts").write_text("export const gammaThree = 1\n")
+    result = _find(call_tool, ts_workspace, "gammaThree")
+    assert result["rebuilt"] is True
+    assert result["results"][0]["file"] == "src/extra.ts"
+    assert _find(call_tool, ts_workspace, "gammaThree")["rebuilt"] is False
+
+
+def test_a_stale_hit_rebuilds_even_inside_the_interval(
+    server_module, call_tool, ts_workspace: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(server_module, "_SYMBOL_RECHECK_SECONDS", 3600)
+    assert _find(call_tool, ts_workspace, "alphaOne")["results"][0]["line"] == 1
+    (ts_workspace / "src" / "app.ts").write_text("// moved\n\nexport function alphaOne() {}\n")
+    result = _find(call_tool, ts_workspace, "alphaOne")
+    assert result["rebuilt"] is True
+    assert result["results"][0]["line"] == 3